@@ -1,14 +1,90 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
 from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.conf import settings
-from django.core.cache import cache
 from django.db.models import OuterRef, Subquery
 from rest_framework.generics import GenericAPIView
 from rest_framework import status
 
-from users_app.models import User,BlockedUser,FriendRequest,UserActivity
+from users_app.models import User,FriendRequest,UserActivity,UserActivityRollup,Friendship
 from utils.utility_functions import custom_response,custom_pagination
+from utils.cache_utils import get_versioned_cache_key,get_or_rebuild
 from apis.user_authentication.user_authentication_serializer import GetUsersSerializer
-from apis.friend_request.friend_request_serializer import PendingUserSerializer,UserActivitySerializer
+from users_app.rate_limiter import RateLimiter,RateLimiterUnavailable
+from users_app.activity_buffer import ActivityBufferFull,activity_buffer,build_activity
+from users_app.rollups import get_period_start
+from users_app.block_cache import is_blocked,exclude_blocked
+from users_app.blocking import block_users,unblock_users
+from users_app.friend_suggestions import get_friend_suggestions,get_mutual_friend_counts,invalidate_friend_suggestions
+from apis.friend_request.friend_request_serializer import PendingUserSerializer,UserActivitySerializer,FriendSuggestionSerializer
+
+
+def activity_buffer_full_response():
+    response = custom_response(status.HTTP_503_SERVICE_UNAVAILABLE,error=False,message='Too many activities are waiting to be saved. Try again later.')
+    response['Retry-After'] = str(settings.USER_ACTIVITY_FLUSH_INTERVAL)
+    return response
+
+
+# Unique ordering of the activity history, matches the user_activity_user_timestamp index
+USER_ACTIVITY_ORDERING = ('-timestamp', '-user_activity_id')
+
+
+def get_user_activities(user, params):
+    """
+    Returns the user's activities filtered by the `activity_type`, `since` and `until`
+    query params, and an error message when a param is invalid.
+    """
+    activities = UserActivity.objects.filter(user=user)
+
+    activity_type = params.get('activity_type', None)
+    if activity_type:
+        activity_types = activity_type.split(',')
+        valid_types = {choice for choice, _ in UserActivity.ACTIVITY_TYPES}
+        if not set(activity_types) <= valid_types:
+            return None, 'Please pass valid activity_type.'
+        activities = activities.filter(activity_type__in=activity_types)
+
+    for param, lookup in (('since', 'timestamp__gte'), ('until', 'timestamp__lt')):
+        value = params.get(param, None)
+        if not value:
+            continue
+        timestamp = parse_timestamp_param(value)
+        if timestamp is None:
+            return None, f'Please pass valid {param}.'
+        activities = activities.filter(**{lookup: timestamp})
+    return activities, None
+
+
+def get_activity_error(activity_type, details):
+    """
+    Returns why an activity can't be logged, None when it is valid.
+    Checked before buffering so one bad row never fails a batch write.
+    """
+    if not activity_type:
+        return 'Activity type is required.'
+    if activity_type not in {choice for choice, _ in UserActivity.ACTIVITY_TYPES}:
+        return 'Please pass valid activity_type.'
+    if details is not None and not isinstance(details, str):
+        return 'Details must be a string.'
+    return None
+
+
+def parse_timestamp_param(value):
+    """
+    Parses an ISO 8601 query param, a '+' of the offset may arrive as a space.
+    Naive timestamps are read in the current time zone, None when invalid.
+    """
+    timestamp = parse_datetime(value.replace(' ', '+'))
+    if timestamp is not None and timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp
 
 
 def get_user_by_id(user_id):
@@ -78,8 +154,8 @@ class FriendRequestAPI(GenericAPIView):
         except Exception:
             return custom_response(status.HTTP_400_BAD_REQUEST,error=True,message='The user you are trying to block does not exist.')
         
-        # Check if the user is blocked
-        if BlockedUser.objects.filter(blocked_by=request.user,blocked_user=receiver).exists():
+        # Check if either user blocked the other, from the cached block set
+        if is_blocked(request.user.user_id, receiver.user_id):
             return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='User has already blocked.')
         
         # Perform the requested action
@@ -94,16 +170,20 @@ class FriendRequestAPI(GenericAPIView):
     
     def send_request(self,sender,receiver):
         """Send a friend request from sender to receiver."""
-        if not FriendRequest.can_send_request(sender, receiver):
-            return custom_response(status.HTTP_429_TOO_MANY_REQUESTS,error=False,message='You cannot send a request now. Try later.')
-        
-         # Check if already sent or received a request
+        # Check if already sent or received a request, before it counts against the limits
         if FriendRequest.objects.filter(sender=sender, receiver=receiver, status='pending').exists():
             return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Friend request already sent.')
+
+        if not FriendRequest.can_send_request(sender, receiver):
+            return custom_response(status.HTTP_429_TOO_MANY_REQUESTS,error=False,message='You cannot send a request now. Try later.')
         
-        # Create friend request
-        with transaction.atomic():
-            FriendRequest.objects.create(sender=sender, receiver=receiver)
+        # Create friend request, the send only counts once it is created
+        try:
+            with transaction.atomic():
+                FriendRequest.objects.create(sender=sender, receiver=receiver)
+        except Exception:
+            FriendRequest.undo_send_request(sender, receiver)
+            raise
         
         return custom_response(status.HTTP_200_OK,error=True,message='Friend request sent.')
     
@@ -113,8 +193,16 @@ class FriendRequestAPI(GenericAPIView):
         if not friend_request:
             return custom_response(status.HTTP_404_NOT_FOUND,error=True,message='No pending request found.')
         with transaction.atomic():
+            was_accepted = friend_request.status == 'accepted'
             friend_request.status = 'rejected'
             friend_request.save()
+            if was_accepted:
+                # Rejecting an accepted request ends the friendship
+                Friendship.remove_friendship(sender.user_id, receiver.user_id)
+                transaction.on_commit(lambda: invalidate_friend_suggestions(sender.user_id, receiver.user_id))
+            transaction.on_commit(
+                lambda: FriendRequest.start_rejection_cooldown(friend_request.sender_id, friend_request.receiver_id)
+            )
         
         return custom_response(status.HTTP_200_OK,error=True,message='Friend request rejected.')
     
@@ -126,19 +214,131 @@ class FriendRequestAPI(GenericAPIView):
         with transaction.atomic():
             friend_request.status = 'accepted'
             friend_request.save()
+            # Store the friendship in both directions
+            Friendship.add_friendship(sender.user_id, receiver.user_id)
         
         return custom_response(status.HTTP_200_OK,error=True,message='Friend request accepted.')
     
 
 
+class BlockUserAPI(GenericAPIView):
+    """
+    API to block or unblock a user.
+
+    Blocking also deletes the friend requests between the two users and
+    removes their friendship and notifications, in one transaction.
+
+    Request Format:
+    POST http://127.0.0.1:8000/api/block-users/
+
+    Body:
+        {
+            "action": "block" | "unblock",
+            "user_id": <user_id>
+        }
+    """
+    def post(self,request):
+        """
+        URL POST :- http://127.0.0.1:8000/api/block-users/
+        Body:
+        {
+            "action":"block",
+            "user_id":5
+        }
+
+        Response:
+        {
+            "status_code": 200,
+            "error": true,
+            "data": {
+                "blocked": 1,
+                "friend_requests": 1,
+                "friendships": 2,
+                "notifications": 3
+            },
+            "message": "User blocked."
+        }
+        """
+        action = request.data.get('action')
+        user_id = request.data.get('user_id')
+
+        if action not in ['block','unblock']:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Please pass valid parameter.')
+
+        user = get_user_by_id(user_id)
+        if user is None:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='The user you are trying to block does not exist.')
+        if user.user_id == request.user.user_id:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='You cannot block yourself.')
+
+        if action == 'block':
+            data = block_users(request.user.user_id, [user.user_id])
+            return custom_response(status.HTTP_200_OK,data,error=True,message='User blocked.')
+
+        if not unblock_users(request.user.user_id, [user.user_id]):
+            return custom_response(status.HTTP_404_NOT_FOUND,error=False,message='User is not blocked.')
+        return custom_response(status.HTTP_200_OK,error=True,message='User unblocked.')
+
+
+class BulkBlockUserAPI(GenericAPIView):
+    """
+    API to block or unblock many users at once, e.g. from moderation tools.
+    """
+    def post(self,request):
+        """
+        Block or unblock up to BLOCK_USERS_BULK_MAX users. Unknown user ids
+        are skipped, the cleanup of all the blocks runs in one transaction.
+
+        URL POST :- http://127.0.0.1:8000/api/block-users/bulk/
+        Body:
+        {
+            "action":"block",
+            "user_ids":[5, 8, 13]
+        }
+
+        Response:
+        {
+            "status_code": 200,
+            "error": true,
+            "data": {
+                "blocked": 3,
+                "friend_requests": 1,
+                "friendships": 2,
+                "notifications": 7
+            },
+            "message": "Users blocked."
+        }
+        """
+        action = request.data.get('action')
+        user_ids = request.data.get('user_ids')
+
+        if action not in ['block','unblock']:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Please pass valid parameter.')
+        if not isinstance(user_ids, list) or not user_ids:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='User ids are required.')
+        if len(user_ids) > settings.BLOCK_USERS_BULK_MAX:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message=f'At most {settings.BLOCK_USERS_BULK_MAX} users are allowed per request.')
+        if not all(isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in user_ids):
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Please pass valid user ids.')
+
+        if action == 'unblock':
+            data = {'unblocked': unblock_users(request.user.user_id, user_ids)}
+            return custom_response(status.HTTP_200_OK,data,error=True,message='Users unblocked.')
+
+        # Unknown ids are dropped with one query instead of failing the insert
+        existing_ids = User.objects.filter(user_id__in=set(user_ids)).values_list('user_id', flat=True)
+        data = block_users(request.user.user_id, existing_ids)
+        return custom_response(status.HTTP_200_OK,data,error=True,message='Users blocked.')
+
+
 class FriendsListAPI(GenericAPIView):
     """
     API to retrieve the list of accepted friends for a user.
     Uses caching to improve performance for frequent queries.
-    Allows cache refresh via query parameter.
+    The cache is invalidated automatically when a friend request or block changes.
     """
 
-    friend_request_model = FriendRequest
+    friendship_model = Friendship
     user_model = User
     serializer_class = GetUsersSerializer
 
@@ -146,12 +346,10 @@ class FriendsListAPI(GenericAPIView):
     def get(self,request):
         """
         Handles GET requests to retrieve the user's accepted friends list.
-        If the 'is_refresh' parameter is set to 'true', the cache is cleared and refreshed.
-        Otherwise, the cached data is returned to optimize performance.
+        The cached data is returned to optimize performance, every page of the
+        cache is dropped at once when a friendship or block of the user changes.
 
-        URL POST :- http://127.0.0.1:8000/api/friend-requests/
-    
-        URL POST :- http://127.0.0.1:8000/api/friend-requests/?is_refresh=true
+        URL GET :- http://127.0.0.1:8000/api/friends_list/
     
         Response:
         {
@@ -161,7 +359,6 @@ class FriendsListAPI(GenericAPIView):
                 "next": null,
                 "previous": null
             },
-            "count": 3,
             "data": [
                 {
                     "user_id": 12,
@@ -186,41 +383,129 @@ class FriendsListAPI(GenericAPIView):
     
         """
 
-        # Cache key based on the user's ID
-        cache_key = f"friends_list_{request.user.user_id}"
-        # Check if cache needs refreshing
-        is_refresh = request.GET.get('is_refresh', None)
+        # Versioned cache key based on the user's ID and the requested page (cursor, page_size),
+        # the version is bumped by the FriendRequest/BlockedUser signals
+        cache_key = get_versioned_cache_key('friends_list', request.user.user_id, request.GET.urlencode())
 
-        get_page_size = 50
+        get_page_size = request.GET.get('page_size', None)
         user = request.user
 
-        # Delete cache if refresh is requested
-        if is_refresh == 'true':
-            cache.delete(cache_key)
-        
-        # Try to retrieve cached data
-        response = cache.get(cache_key)
-
-        if response is None:
-
-            # Get IDs of users who have accepted the friend request from the current user
-            user_id = self.friend_request_model.objects.filter(receiver=user,status='accepted').values_list('sender__user_id',flat=True)
-            # Fetch user data for the accepted friends
-            user_queryset = self.user_model.objects.filter(user_id__in=[user_id])
+        def build_friends_list():
+            # Get IDs of the user's friends from the symmetric friendship edges
+            friend_ids = self.friendship_model.objects.filter(user=user).values('friend_id')
+            # Fetch user data for the friends
+            user_queryset = exclude_blocked(
+                self.user_model.objects.filter(user_id__in=friend_ids), user.user_id
+            )
         
             #return data in pagination
-            response = custom_pagination(
+            return custom_pagination(
                 get_page_size=get_page_size,
                 request=request,
                 serializer_class=self.serializer_class,
                 queryset=user_queryset,
+                ordering=('user_id',),
+                profile='friends_list',
             )
 
-            # Cache the response for 30 minutes
-            cache.set(cache_key, response, timeout=settings.CACHE_TIMEOUT)
+        # Cached response, rebuilt by a single request when it expires
+        response = get_or_rebuild(cache_key, build_friends_list, settings.CACHE_TIMEOUT, name='friends_list')
             
         return custom_response(status.HTTP_200_OK,response,error=True,is_pagination=True)
 
+class FriendSuggestionsAPI(GenericAPIView):
+    """
+    API to suggest friends of friends, ranked by mutual-friend count.
+    Existing friends, pending requests and blocked users are never suggested.
+    """
+    user_model = User
+    serializer_class = FriendSuggestionSerializer
+
+    def get(self,request):
+        """
+        URL GET :- http://127.0.0.1:8000/api/friends/suggestions/
+
+        ## limit is optional, 10 by default and FRIEND_SUGGESTIONS_LIMIT at most
+        URL GET :- http://127.0.0.1:8000/api/friends/suggestions/?limit=20
+
+        Response:
+        {
+            "status_code": 200,
+            "error": true,
+            "data": [
+                {
+                    "user_id": 9,
+                    "username": "rakesh",
+                    "email": "rakesh@gmail.com",
+                    "mutual_friends_count": 4
+                },
+                {
+                    "user_id": 3,
+                    "username": "raj",
+                    "email": "raj@gmail.com",
+                    "mutual_friends_count": 1
+                }
+            ],
+            "message": ""
+        }
+        """
+        try:
+            limit = int(request.GET.get('limit', 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, settings.FRIEND_SUGGESTIONS_LIMIT))
+
+        # Top-N candidates are precomputed and cached per user
+        suggestions = get_friend_suggestions(request.user.user_id)[:limit]
+        mutual_friend_counts = dict(suggestions)
+
+        # Fetch the suggested users in one query and keep the ranking order
+        users = self.user_model.objects.filter(user_id__in=mutual_friend_counts.keys(), is_active=True).in_bulk()
+        user_list = [users[user_id] for user_id, _ in suggestions if user_id in users]
+
+        context = {'mutual_friend_counts': mutual_friend_counts}
+        response = self.serializer_class(user_list, many=True, context=context).data
+        return custom_response(status.HTTP_200_OK,response,error=True)
+
+
+class MutualFriendsCountAPI(GenericAPIView):
+    """
+    API to get mutual-friend counts for many users at once, e.g. one rendered page of user cards.
+    """
+    max_user_ids = 100
+
+    def get(self,request):
+        """
+        URL GET :- http://127.0.0.1:8000/api/friends/mutual-counts/?user_ids=3,6,9
+
+        Response:
+        {
+            "status_code": 200,
+            "error": true,
+            "data": {
+                "3": 2,
+                "6": 0,
+                "9": 5
+            },
+            "message": ""
+        }
+        """
+        try:
+            user_ids = [int(user_id) for user_id in request.GET.get('user_ids', '').split(',') if user_id]
+        except ValueError:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Please pass valid user ids.')
+
+        if not user_ids:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='User ids are required.')
+        if len(user_ids) > self.max_user_ids:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message=f'At most {self.max_user_ids} user ids are allowed.')
+
+        # All counts in one grouped query
+        mutual_friend_counts = get_mutual_friend_counts(request.user.user_id, user_ids)
+        response = {str(user_id): mutual_friend_counts.get(user_id, 0) for user_id in user_ids}
+        return custom_response(status.HTTP_200_OK,response,error=True)
+
+
 class PendingRequest(GenericAPIView):
     """
     API view to retrieve a list of pending friend requests received by the user.
@@ -238,6 +523,9 @@ class PendingRequest(GenericAPIView):
 
         Query Parameters:
         - page_size: Optional. Number of results per page for pagination.
+        - cursor: Optional. Opaque cursor taken from the `next`/`previous` links.
+        - with_count: Optional. Pass `true` to include the total `count`.
+        - include_mutual_friends: Optional. Pass `true` to add `mutual_friends_count`.
 
         Response:
         {
@@ -247,7 +535,6 @@ class PendingRequest(GenericAPIView):
                 "next": null,
                 "previous": null
             },
-            "count": 5,
             "data": [
                 {
                 "user_id": 1,
@@ -265,19 +552,24 @@ class PendingRequest(GenericAPIView):
         """
         get_page_size = request.GET.get('page_size', None)
         user = request.user
+        context = {
+            'user': user,
+            'include_mutual_friends': request.GET.get('include_mutual_friends') == 'true',
+        }
         
         # Retrieve all pending friend requests for the current user,
         # sorted by the creation time in descending order (most recent first)
         pending_requests = self.friend_request_model.objects.filter(receiver=user, status='pending').order_by('-created_at')
+        pending_requests = exclude_blocked(pending_requests, user.user_id, field='sender_id')
         user_ids = pending_requests.values_list('sender__user_id', flat=True)
 
-        # Get the user queryset based on the sender IDs,
-        # ordered by the creation time of their friend requests in descending order
+        # Get the user queryset based on the sender IDs, annotated with the creation
+        # time of their friend requests (pagination orders by it, most recent first)
         user_queryset = self.user_model.objects.filter(user_id__in=user_ids).annotate(
             request_created_at=Subquery(
                 pending_requests.filter(sender__user_id=OuterRef('user_id')).values('created_at')[:1]
             )
-        ).order_by('-request_created_at')
+        )
 
         # return data in pagination
         response = custom_pagination(
@@ -285,6 +577,8 @@ class PendingRequest(GenericAPIView):
             request=request,
             serializer_class=self.serializer_class,
             queryset=user_queryset,
+            context=context,
+            ordering=('-request_created_at','-user_id'),
         )    
         return custom_response(status.HTTP_200_OK,response,error=True,is_pagination=True)
 
@@ -299,6 +593,8 @@ class UserActivityLogAPI(GenericAPIView):
     def post(self,request):
         """
         Log a new user activity.
+        The activity is queued and written in a batch shortly after, hence 202.
+        When the queue is full the API answers 503 with a Retry-After header.
 
         Request Body:
         - activity_type: Type of activity (e.g., 'friend_request_sent', 'friend_request_accepted')
@@ -314,7 +610,7 @@ class UserActivityLogAPI(GenericAPIView):
 
         Response:
         {
-            "status_code": 201,
+            "status_code": 202,
             "error": true,
             "data": {
                 "user": 2,
@@ -330,25 +626,48 @@ class UserActivityLogAPI(GenericAPIView):
         activity_type = request.data.get('activity_type')
         details = request.data.get('details', '')
 
-        if not activity_type:
-            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Activity type is required.')
+        error = get_activity_error(activity_type, details)
+        if error:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message=error)
+
+        # Per-user limit from settings.RATE_LIMITS, logging is skipped if the cache is down
+        try:
+            rate_limit = RateLimiter('user_activity').hit(request.user.user_id)
+        except RateLimiterUnavailable:
+            rate_limit = None
+        if rate_limit and not rate_limit.allowed:
+            return custom_response(status.HTTP_429_TOO_MANY_REQUESTS,error=False,message=f'Too many activities. Try again in {int(rate_limit.wait) + 1} seconds.')
         
-        # Create and save the activity log
-        activity = UserActivity.objects.create(user=request.user, activity_type=activity_type, details=details)
-        response = self.serializer_class(activity).data
+        # Queue the activity, it is written in a batch by the activity buffer
+        activity = build_activity(request.user.user_id, activity_type, details)
+        try:
+            activity_buffer.add([activity])
+        except ActivityBufferFull:
+            return activity_buffer_full_response()
+        response = self.serializer_class(UserActivity(**activity)).data
 
-        return custom_response(status.HTTP_201_CREATED,response,error=True)
+        return custom_response(status.HTTP_202_ACCEPTED,response,error=True)
     
     def get(self,request):
         """
-        Retrieve all activities for the authenticated user.
+        Retrieve the activities of the authenticated user, newest first, with keyset pagination
+        over (timestamp, user_activity_id) served by the user_activity_user_timestamp index.
+
+        Query params (all optional):
+        - activity_type: one type or several separated by commas
+        - since / until: ISO 8601 timestamps, activities with since <= timestamp < until
+        - page_size, cursor, with_count
 
-        URL GET: http://127.0.0.1:8000/api/user-activities/
+        URL GET: http://127.0.0.1:8000/api/user-activities/?page_size=20&activity_type=friend_request_sent&since=2024-09-01T00:00:00Z
 
         Response:
         {
-            "status_code": 201,
+            "status_code": 200,
             "error": true,
+            "links": {
+                "next": "http://127.0.0.1:8000/api/user-activities/?cursor=eyJ2Ijpb...&page_size=20",
+                "previous": null
+            },
             "data": [
                 {
                 "user": 2,
@@ -367,37 +686,223 @@ class UserActivityLogAPI(GenericAPIView):
         }
 
         """
-        activities = self.model.objects.filter(user=request.user).order_by('-timestamp')
-        serializer = self.serializer_class(activities, many=True)
-        response = serializer.data
-        return custom_response(status.HTTP_201_CREATED,response,error=True)
-
-
-
-    
-
-
-        
-
+        get_page_size = request.GET.get('page_size', None)
+        activities, error_message = get_user_activities(request.user, request.GET)
+        if error_message:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message=error_message)
 
+        # return data in keyset pages, capped by the user_activity page-size profile
+        response = custom_pagination(
+            get_page_size=get_page_size,
+            request=request,
+            serializer_class=self.serializer_class,
+            queryset=activities,
+            ordering=USER_ACTIVITY_ORDERING,
+            profile='user_activity',
+        )
+        return custom_response(status.HTTP_200_OK,response,error=True,is_pagination=True)
 
 
+class UserActivityExportAPI(GenericAPIView):
+    """
+    API to export the activities of the authenticated user as a stream.
+    """
+    export_formats = ('jsonl', 'csv')
+    fields = ('user_activity_id', 'activity_type', 'timestamp', 'details')
 
+    def get(self,request):
+        """
+        Stream every activity matching the filters of /api/user-activities/, newest first.
+        Rows are read from the database in chunks and written as they come, so the export
+        never holds the whole history in memory. `export_format` is jsonl (default) or csv.
 
+        URL GET: http://127.0.0.1:8000/api/user-activities/export/?export_format=csv&since=2024-09-01T00:00:00Z
 
+        Response (jsonl):
+        {"user_activity_id": 42, "activity_type": "friend_request_sent", "timestamp": "2024-09-23T09:57:58.878681Z", "details": "Sent a friend request"}
+        {"user_activity_id": 41, "activity_type": "friend_request_sent", "timestamp": "2024-09-23T09:57:57.652482Z", "details": "Sent a friend request"}
+        """
+        export_format = request.GET.get('export_format', 'jsonl')
+        if export_format not in self.export_formats:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Please pass valid export_format.')
+        activities, error_message = get_user_activities(request.user, request.GET)
+        if error_message:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message=error_message)
+
+        rows = activities.order_by(*USER_ACTIVITY_ORDERING).values_list(*self.fields).iterator(chunk_size=2000)
+        if export_format == 'csv':
+            content, content_type = self.stream_csv(rows), 'text/csv'
+        else:
+            content, content_type = self.stream_jsonl(rows), 'application/x-ndjson'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="user-activities.{export_format}"'
+        return response
+
+    def stream_jsonl(self, rows):
+        for row in rows:
+            yield json.dumps(dict(zip(self.fields, row)), cls=DjangoJSONEncoder) + '\n'
+
+    def stream_csv(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.fields)
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+
+class UserActivityAnalyticsAPI(GenericAPIView):
+    """
+    API to read activity counts of the authenticated user per hour or per day.
+    """
+    # Default range and maximum number of periods per granularity
+    granularities = {
+        'hour': (timedelta(hours=48), timedelta(days=31)),
+        'day': (timedelta(days=30), timedelta(days=366)),
+    }
 
+    def get(self,request):
+        """
+        Return the activity counts per period and type from the precomputed rollups
+        (one small row per user, period and type) instead of grouping raw activities.
 
+        Query params (all optional):
+        - granularity: hour | day (default day)
+        - since / until: ISO 8601 timestamps, periods with since <= period_start < until
+          (last 48 hours or last 30 days by default, at most 31 or 366 days)
+        - activity_type: one type or several separated by commas
 
-        
+        URL GET: http://127.0.0.1:8000/api/user-activities/analytics/?granularity=day&since=2024-09-01T00:00:00Z
 
+        Response:
+        {
+            "status_code": 200,
+            "error": false,
+            "data": {
+                "granularity": "day",
+                "since": "2024-09-01T00:00:00Z",
+                "until": "2024-09-30T10:00:00Z",
+                "totals": {
+                    "friend_request_sent": 12,
+                    "friend_request_accepted": 4
+                },
+                "series": [
+                    {
+                    "period_start": "2024-09-23T00:00:00Z",
+                    "activity_type": "friend_request_sent",
+                    "activity_count": 7
+                    }
+                ]
+            },
+            "message": ""
+        }
+        """
+        granularity = request.GET.get('granularity', 'day')
+        if granularity not in self.granularities:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Please pass valid granularity.')
+        default_range, max_range = self.granularities[granularity]
+
+        until = timezone.now()
+        if request.GET.get('until'):
+            until = parse_timestamp_param(request.GET['until'])
+            if until is None:
+                return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Please pass valid until.')
+        since = until - default_range
+        if request.GET.get('since'):
+            since = parse_timestamp_param(request.GET['since'])
+            if since is None:
+                return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Please pass valid since.')
+        if since >= until or until - since > max_range:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message=f'The range must be positive and at most {max_range.days} days.')
+
+        rollups = UserActivityRollup.objects.filter(
+            user=request.user,
+            granularity=granularity,
+            period_start__gte=get_period_start(since, granularity),
+            period_start__lt=until,
+        )
+        activity_type = request.GET.get('activity_type', None)
+        if activity_type:
+            rollups = rollups.filter(activity_type__in=activity_type.split(','))
+
+        series = list(
+            rollups.order_by('period_start', 'activity_type').values('period_start', 'activity_type', 'activity_count')
+        )
+        totals = {}
+        for row in series:
+            totals[row['activity_type']] = totals.get(row['activity_type'], 0) + row['activity_count']
+
+        data = {
+            'granularity': granularity,
+            'since': since,
+            'until': until,
+            'totals': totals,
+            'series': series,
+        }
+        return custom_response(status.HTTP_200_OK,data,error=False)
 
 
-            
+class UserActivityBatchAPI(GenericAPIView):
+    """
+    API to log many user activities in one request.
+    """
+    serializer_class = UserActivitySerializer
 
+    def post(self,request):
+        """
+        Log up to USER_ACTIVITY_BATCH_MAX activities at once. All activities are
+        queued for a batch write or none of them (503 with Retry-After when the queue is full).
 
+        URL :POST : http://127.0.0.1:8000/api/user-activities/batch/
 
+        Body:
+        {
+            "activities": [
+                {"activity_type": "friend_request_sent", "details": "Sent a friend request"},
+                {"activity_type": "friend_request_accepted"}
+            ]
+        }
 
-        
+        Response:
+        {
+            "status_code": 202,
+            "error": true,
+            "data": {
+                "accepted_count": 2
+            },
+            "message": ""
+        }
+        """
+        activities = request.data.get('activities')
+        if not isinstance(activities, list) or not activities:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message='Activities are required.')
+        if len(activities) > settings.USER_ACTIVITY_BATCH_MAX:
+            return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message=f'At most {settings.USER_ACTIVITY_BATCH_MAX} activities are allowed per request.')
+        for index, activity in enumerate(activities):
+            if not isinstance(activity, dict):
+                return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message=f'Activity {index}: activity must be an object.')
+            error = get_activity_error(activity.get('activity_type'), activity.get('details', ''))
+            if error:
+                return custom_response(status.HTTP_400_BAD_REQUEST,error=False,message=f'Activity {index}: {error}')
+
+        # Every batch counts as one hit of its own per-user limit
+        try:
+            rate_limit = RateLimiter('user_activity_batch').hit(request.user.user_id)
+        except RateLimiterUnavailable:
+            rate_limit = None
+        if rate_limit and not rate_limit.allowed:
+            return custom_response(status.HTTP_429_TOO_MANY_REQUESTS,error=False,message=f'Too many activities. Try again in {int(rate_limit.wait) + 1} seconds.')
 
-        
-    
+        user_id = request.user.user_id
+        try:
+            activity_buffer.add([
+                build_activity(user_id, activity['activity_type'], activity.get('details', ''))
+                for activity in activities
+            ])
+        except ActivityBufferFull:
+            return activity_buffer_full_response()
+
+        return custom_response(status.HTTP_202_ACCEPTED,{'accepted_count': len(activities)},error=True)
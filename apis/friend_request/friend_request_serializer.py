@@ -1,15 +1,17 @@
 from rest_framework import serializers
 from users_app.models import FriendRequest,User,UserActivity
+from apis.user_authentication.user_authentication_serializer import MutualFriendsCountMixin,MutualFriendsListSerializer
 
 
 
-class PendingUserSerializer(serializers.ModelSerializer):
+class PendingUserSerializer(MutualFriendsCountMixin, serializers.ModelSerializer):
     """
     This serializer for pending friend request.
     """
     class Meta:
         model = User
-        fields = ['user_id', 'username']
+        fields = ['user_id', 'username', 'mutual_friends_count']
+        list_serializer_class = MutualFriendsListSerializer
 
 class UserActivitySerializer(serializers.ModelSerializer):
     """
@@ -17,4 +19,18 @@ class UserActivitySerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = UserActivity
-        fields = ['user', 'activity_type', 'timestamp', 'details']
\ No newline at end of file
+        fields = ['user', 'activity_type', 'timestamp', 'details']
+
+class FriendSuggestionSerializer(serializers.ModelSerializer):
+    """
+    This serializer for friend suggestions, mutual_friends_count is taken
+    from the `mutual_friend_counts` dict passed in the context.
+    """
+    mutual_friends_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['user_id', 'username', 'email', 'mutual_friends_count']
+
+    def get_mutual_friends_count(self, obj):
+        return self.context.get('mutual_friend_counts', {}).get(obj.user_id, 0)
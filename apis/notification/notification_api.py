@@ -1,8 +1,22 @@
+from datetime import datetime, time, timedelta
+
 from rest_framework.generics import GenericAPIView
 from rest_framework import status
+from rest_framework.utils.urls import replace_query_param
+from django.db.models import Case, CharField, F, Value, When, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
-from utils.utility_functions import custom_response,custom_pagination
+from django.utils.dateparse import parse_datetime
+from utils.utility_functions import (
+    custom_response,
+    custom_pagination,
+    get_pagination_profile,
+    get_valid_page_size,
+    KeysetPagination,
+)
 from notification_app.models import Notification
+from users_app.block_cache import exclude_blocked
+from notification_app.counters import get_unread_count, mark_notifications_read
 from apis.notification.notification_serializer import NotificationSerializer
 
 class NotificationListAPI(GenericAPIView):
@@ -11,11 +25,14 @@ class NotificationListAPI(GenericAPIView):
     """
     model = Notification
     serializer_class = NotificationSerializer
+    buckets = ('today', 'yesterday', 'last_7_days')
+    ordering = ('-created_at', '-notification_id')
 
     def get(self,request):
         """
         GET endpoint to retrieve user notifications.
-        Groups notifications into today, yesterday, and last 7 days.
+        Groups notifications into today, yesterday, and last 7 days (the five days before yesterday),
+        every bucket holds at most `page_size` notifications.
 
         URL: http://127.0.0.1:8000/api/notifications-list/
 
@@ -43,58 +60,199 @@ class NotificationListAPI(GenericAPIView):
             ],
             "yesterday": [],
             "last_7_days": [],
+            "links": {
+                "today": "http://127.0.0.1:8000/api/notifications-list/?bucket=today&cursor=eyJ2Ijpb...",
+                "yesterday": null,
+                "last_7_days": null
+            },
+            "message": ""
+        }
+
+        ## follow a bucket's link to load more notifications of that bucket.
+        URL: http://127.0.0.1:8000/api/notifications-list/?bucket=today&cursor=eyJ2Ijpb...
+
+        Response:
+        {
+            "status_code": 200,
+            "error": false,
+            "links": {
+                "next": null,
+                "previous": "http://127.0.0.1:8000/api/notifications-list/?bucket=today&cursor=eyJ2Ijpb..."
+            },
+            "data": [...],
             "message": ""
         }
-        
         """
         user = request.user
-        today = timezone.now().date()
-        yesterday = timezone.now().date() - timezone.timedelta(days=1)
-        last_7_days = timezone.now().date() - timezone.timedelta(days=7)
         context = {'user': user}
+        bucket_ranges = self.get_bucket_ranges()
+        pagination_profile = get_pagination_profile('notifications')
+        page_size = get_valid_page_size(request.GET.get('page_size', None), pagination_profile)
 
         # Start with notifications for the user, excluding self-notifications
         users_notification = self.model.objects.filter(to_user=user).exclude(
             from_user=user
-        )
+        ).select_related('from_user', 'to_user')
+        # and notifications from users blocked by or blocking the user
+        users_notification = exclude_blocked(users_notification, user.user_id, field='from_user_id')
+
+        # Load more of a single bucket
+        bucket = request.GET.get('bucket', None)
+        if bucket is not None:
+            if bucket not in bucket_ranges:
+                return custom_response(status.HTTP_400_BAD_REQUEST, message='Please pass valid bucket.')
+            start, end = bucket_ranges[bucket]
+            notifications = users_notification.filter(created_at__gte=start)
+            if end is not None:
+                notifications = notifications.filter(created_at__lt=end)
+            response = custom_pagination(
+                get_page_size=page_size,
+                request=request,
+                serializer_class=self.serializer_class,
+                queryset=notifications,
+                context=context,
+                ordering=self.ordering,
+                profile='notifications',
+            )
+            return custom_response(
+                status.HTTP_200_OK, response, error=False, is_pagination=True
+            )
 
         # Prepare data grouped by time 
-        data = {
-            'today':self.get_notifications_for_day(
-                users_notification, today, context
-            ),
-            'yesterday':self.get_notifications_for_day(
-                users_notification, yesterday, context
-            ),
-            'last_7_days':self.get_notifications_for_last_week(
-                users_notification, last_7_days, context
-            ),
-        }
+        data = self.get_grouped_notifications(
+            request, users_notification, bucket_ranges, page_size, context
+        )
         return custom_response(
             status.HTTP_200_OK, data, error=False, is_pagination=True
         )
-    
-    def get_notifications_for_day(self, users_notification, day, context):
-        # Filter and order notifications by the specified day
-        notifications = users_notification.filter(created_at__date=day).order_by('-created_at')
-        return self.serializer_class(notifications, context=context, many=True).data
-    
-    def get_notifications_for_last_week(self, users_notification, last_7_days, context):
+
+    def get_bucket_ranges(self):
+        """
+        Returns the [start, end) datetime range of every bucket, `end` is None for today.
         """
-        Get notifications from the last 7 days.
-        
-        Args:
-            users_notification (QuerySet): Filtered notifications.
-            last_7_days (datetime.date): Date for one week ago.
-            context (dict): Context for the serializer.
+        today = timezone.localdate()
+        today_start = timezone.make_aware(datetime.combine(today, time.min))
+        yesterday_start = today_start - timedelta(days=1)
+        last_7_days_start = today_start - timedelta(days=7)
+        return {
+            'today': (today_start, None),
+            'yesterday': (yesterday_start, today_start),
+            'last_7_days': (last_7_days_start, yesterday_start),
+        }
+
+    def get_grouped_notifications(self, request, users_notification, bucket_ranges, page_size, context):
+        """
+        Fetches the first page of every bucket with a single query.
+
+        Every row is labelled with its bucket and numbered inside it with a
+        ROW_NUMBER() window, so the query returns at most `page_size + 1`
+        rows per bucket. The extra row tells whether the bucket has more.
         """
-        # Filter and order notifications for the last 7 days, limit to 50 results
+        bucket = Case(
+            When(created_at__gte=bucket_ranges['today'][0], then=Value('today')),
+            When(created_at__gte=bucket_ranges['yesterday'][0], then=Value('yesterday')),
+            default=Value('last_7_days'),
+            output_field=CharField(),
+        )
         notifications = users_notification.filter(
-            created_at__date=last_7_days
-        ).order_by('-created_at')[:50]
+            created_at__gte=bucket_ranges['last_7_days'][0]
+        ).annotate(
+            bucket=bucket,
+            bucket_row=Window(
+                RowNumber(),
+                partition_by=[bucket],
+                order_by=[F('created_at').desc(), F('notification_id').desc()],
+            ),
+        ).filter(bucket_row__lte=page_size + 1).order_by(*self.ordering)
 
-        # Serialize the notifications data
-        return self.serializer_class(notifications, context=context, many=True).data
+        # Group rows into buckets in Python
+        grouped = {name: [] for name in self.buckets}
+        for notification in notifications:
+            grouped[notification.bucket].append(notification)
 
+        paginator = KeysetPagination(ordering=self.ordering)
+        paginator.request = request
+        data = {}
+        links = {}
+        for name in self.buckets:
+            bucket_notifications = grouped[name][:page_size]
+            links[name] = None
+            if len(grouped[name]) > page_size:
+                # Cursor to load more of this bucket, after its last row
+                next_link = paginator.encode_cursor(paginator.get_position(bucket_notifications[-1]))
+                links[name] = replace_query_param(next_link, 'bucket', name)
+            data[name] = self.serializer_class(bucket_notifications, context=context, many=True).data
+        data['links'] = links
+        return data
 
 
+class UnreadNotificationCountAPI(GenericAPIView):
+    """
+    API to get the unread notification count of the logged-in user.
+    """
+
+    def get(self, request):
+        """
+        GET endpoint to retrieve the unread count, a single primary-key lookup on the counter table.
+
+        URL: http://127.0.0.1:8000/api/notifications/unread-count/
+
+        Response:
+        {
+            "status_code": 200,
+            "error": false,
+            "data": {
+                "unread_count": 3
+            },
+            "message": ""
+        }
+        """
+        data = {'unread_count': get_unread_count(request.user.user_id)}
+        return custom_response(status.HTTP_200_OK, data, error=False)
+
+
+class MarkNotificationsReadAPI(GenericAPIView):
+    """
+    API to mark the logged-in user's notifications as read.
+    """
+
+    def post(self, request):
+        """
+        POST endpoint to mark notifications as read with a single UPDATE.
+        Without `up_to` every unread notification is marked, with `up_to` only
+        the ones created at or before it (e.g. the `created_at` of the newest
+        notification the client has shown).
+
+        URL: http://127.0.0.1:8000/api/notifications/mark-read/
+
+        Request:
+        {
+            "up_to": "2024-09-23T11:24:49.133473Z"
+        }
+
+        Response:
+        {
+            "status_code": 200,
+            "error": false,
+            "data": {
+                "marked_count": 2,
+                "unread_count": 1
+            },
+            "message": "Notifications marked as read."
+        }
+        """
+        user = request.user
+        up_to = request.data.get('up_to', None)
+        if up_to is not None:
+            up_to = parse_datetime(str(up_to))
+            if up_to is None:
+                return custom_response(status.HTTP_400_BAD_REQUEST, message='Please pass valid up_to.')
+            if timezone.is_naive(up_to):
+                up_to = timezone.make_aware(up_to)
+
+        marked_count = mark_notifications_read(user.user_id, timezone.now(), up_to=up_to)
+        data = {
+            'marked_count': marked_count,
+            'unread_count': get_unread_count(user.user_id),
+        }
+        return custom_response(status.HTTP_200_OK, data, error=False, message='Notifications marked as read.')
@@ -8,9 +8,37 @@ class NotificationSerializer(serializers.ModelSerializer):
     """
     from_user_data = GetUsersSerializer(source='from_user')
     to_user_data = GetUsersSerializer(source='to_user')
+    summary = serializers.SerializerMethodField()
+
+    # (single actor, several actors) templates per notification type
+    summary_templates = {
+        'friend_request_sent': (
+            '{name} sent you a friend request.',
+            '{name} and {others} sent you friend requests.',
+        ),
+        'friend_request_accepted': (
+            '{name} accepted your friend request.',
+            '{name} and {others} accepted your friend requests.',
+        ),
+    }
+
+    default_summary_template = (
+        '{name} sent you a notification.',
+        '{name} and {others} sent you notifications.',
+    )
 
     class Meta:
         model = Notification
         exclude = ('notification_id','from_user','to_user')
 
-
+    def get_summary(self, obj):
+        """
+        Describes the notification with its latest actor, e.g. "Raj and 41 others sent you friend requests."
+        """
+        single, several = self.summary_templates.get(obj.notification_type, self.default_summary_template)
+        name = obj.from_user.username or obj.from_user.email
+        others_count = obj.actor_count - 1
+        if others_count <= 0:
+            return single.format(name=name)
+        others = '1 other' if others_count == 1 else f'{others_count} others'
+        return several.format(name=name, others=others)
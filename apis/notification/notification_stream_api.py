@@ -0,0 +1,93 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from users_app.custom_authention import StatelessJWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from notification_app.broker import get_broker
+from utils.constant import *
+
+
+class NotificationStreamAPI(View):
+    """
+    Server-Sent Events stream pushing new notifications to the logged-in user.
+
+    Replaces polling /api/notifications-list/: one long-lived connection per
+    client receives every notification as soon as it is created. The view
+    is async, so it has to be served through social_network.asgi
+    (e.g. `gunicorn social_network.asgi -k uvicorn.workers.UvicornWorker`).
+    """
+
+    async def get(self, request):
+        """
+        URL GET : http://127.0.0.1:8000/api/notifications/stream/?token=<access_token>
+
+        The access token can be passed as `Authorization: Bearer <token>` or,
+        because browsers' EventSource can't set headers, as `token` in PARAM.
+
+        Stream:
+            retry: 3000
+
+            event: notification
+            data: {"notification_id": 12, "from_user_data": {...}, "to_user_data": {...}, "created_at": "...", ...}
+
+            : keep-alive
+        """
+        if not isinstance(request, ASGIRequest):
+            return self.error_response(
+                status.HTTP_501_NOT_IMPLEMENTED,
+                "Notification stream is only available when served through ASGI.",
+            )
+
+        user = await sync_to_async(self.authenticate)(request)
+        if user is None:
+            return self.error_response(
+                status.HTTP_401_UNAUTHORIZED, "Authentication credentials were not provided."
+            )
+
+        response = StreamingHttpResponse(
+            self.event_stream(user.user_id), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # Don't let nginx buffer the stream
+        return response
+
+    async def event_stream(self, user_id):
+        yield "retry: 3000\n\n"
+        async for event in get_broker().listen(
+            user_id, heartbeat=settings.NOTIFICATION_STREAM_HEARTBEAT
+        ):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: notification\ndata: {json.dumps(event)}\n\n"
+
+    def authenticate(self, request):
+        authentication = StatelessJWTAuthentication()
+        raw_token = request.GET.get("token")
+        try:
+            if raw_token:
+                validated_token = authentication.get_validated_token(raw_token)
+                return authentication.get_user(validated_token)
+            result = authentication.authenticate(request)
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            return None
+        return result[0] if result else None
+
+    @staticmethod
+    def error_response(status_code, message):
+        return JsonResponse(
+            {
+                CUSTOM_RESPONSE_STATUS_CODE: status_code,
+                CUSTOM_RESPONSE_ERROR: True,
+                CUSTOM_RESPONSE_DATA: {},
+                CUSTOM_RESPONSE_MESSAGE: message,
+            },
+            status=status_code,
+        )
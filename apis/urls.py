@@ -1,28 +1,57 @@
+from django.conf import settings
 from django.urls import path
 from apis.user_authentication.user_authentication_api import (
     SignUpAPI,
     UserLoginAPI,
     GetUsers,
+    UserAutocompleteAPI,
+)
+from apis.user_authentication.user_authentication_async_api import (
+    AsyncSignUpAPI,
+    AsyncUserLoginAPI,
 )
 from apis.friend_request.friend_request_api import (
     FriendRequestAPI,
+    BlockUserAPI,
+    BulkBlockUserAPI,
     FriendsListAPI,
+    FriendSuggestionsAPI,
+    MutualFriendsCountAPI,
     PendingRequest,
     UserActivityLogAPI,
+    UserActivityBatchAPI,
+    UserActivityExportAPI,
+    UserActivityAnalyticsAPI,
+)
+from apis.notification.notification_api import (
+    NotificationListAPI,
+    UnreadNotificationCountAPI,
+    MarkNotificationsReadAPI,
 )
-from apis.notification.notification_api import NotificationListAPI
+from apis.notification.notification_stream_api import NotificationStreamAPI
 from apis.post_app.post_app_api import AddPostMediaAPI
 
 urlpatterns = [
-    path("sign-up/", SignUpAPI.as_view()),
-    path("login/", UserLoginAPI.as_view()),
+    path("sign-up/", AsyncSignUpAPI.as_view() if settings.ASYNC_AUTH_VIEWS else SignUpAPI.as_view()),
+    path("login/", AsyncUserLoginAPI.as_view() if settings.ASYNC_AUTH_VIEWS else UserLoginAPI.as_view()),
     path("get_user/", GetUsers.as_view()),
+    path("users/autocomplete/", UserAutocompleteAPI.as_view()),
     path("friend-requests/", FriendRequestAPI.as_view()),
+    path("block-users/", BlockUserAPI.as_view()),
+    path("block-users/bulk/", BulkBlockUserAPI.as_view()),
     path("friends_list/", FriendsListAPI.as_view()),
+    path("friends/suggestions/", FriendSuggestionsAPI.as_view()),
+    path("friends/mutual-counts/", MutualFriendsCountAPI.as_view()),
     path("pending-requests/", PendingRequest.as_view()),
     path("user-activities/", UserActivityLogAPI.as_view()),
+    path("user-activities/batch/", UserActivityBatchAPI.as_view()),
+    path("user-activities/export/", UserActivityExportAPI.as_view()),
+    path("user-activities/analytics/", UserActivityAnalyticsAPI.as_view()),
     # Notification
     path("notifications-list/", NotificationListAPI.as_view()),
+    path("notifications/stream/", NotificationStreamAPI.as_view()),
+    path("notifications/unread-count/", UnreadNotificationCountAPI.as_view()),
+    path("notifications/mark-read/", MarkNotificationsReadAPI.as_view()),
    
     # Post
     path("post/add-media/", AddPostMediaAPI.as_view()),
@@ -1,17 +1,35 @@
 from rest_framework.generics import GenericAPIView
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from users_app.custom_authention import StatelessRefreshToken
 
 from users_app.custome_throttle import LoginThrottle
 from users_app.models import User
+from users_app.search_index import search_users
+from users_app.autocomplete import autocomplete_index
+from users_app.block_cache import exclude_blocked,get_block_set
 
+from django.conf import settings
 from django.contrib.auth import authenticate
-from django.db.models import Q
 from utils.utility_functions import custom_response,custom_pagination
 from users_app.custom_permission import RoleBasedPermission
 from apis.user_authentication.user_authentication_serializer import SignUpSerializer,GetUsersSerializer
 
 
+def get_login_response_data(user):
+    """
+    Creates the tokens of a logged-in user, shared by the sync and async login views.
+    """
+    response_data = {}
+    # create token for user
+    refresh = StatelessRefreshToken.for_user(user)
+
+    response_data["user_id"] = user.user_id
+    response_data["email"] = user.email
+    response_data["refresh"] = str(refresh),
+    response_data["access"] = str(refresh.access_token),
+    return response_data
+
+
 class SignUpAPI(GenericAPIView):
     """
     User can sign up using this api.
@@ -53,13 +71,11 @@ class SignUpAPI(GenericAPIView):
         """
         response_data = {}
         serializer = self.serializer_class(data=request.data)
-        if serializer.is_valid(raise_exception=True):
-            user = serializer.save()
+        serializer.is_valid(raise_exception=True)
+        user = serializer.save()
 
-        get_user = User.objects.filter(email__iexact=user.email).first()
-
-        response_data["user_id"] = get_user.user_id
-        response_data["email"] = get_user.email
+        response_data["user_id"] = user.user_id
+        response_data["email"] = user.email
         return custom_response(
             status.HTTP_201_CREATED,
             response_data,
@@ -120,7 +136,6 @@ class UserLoginAPI(GenericAPIView):
 
 
         """
-        response_data = {}
         request_data = request.data
 
         email = request_data.get("email")
@@ -134,13 +149,7 @@ class UserLoginAPI(GenericAPIView):
                 message="Please check email and password",
             )
         
-        # create token for user
-        refresh = RefreshToken.for_user(user)
-
-        response_data["user_id"] = user.user_id
-        response_data["email"] = user.email
-        response_data["refresh"] = str(refresh),
-        response_data["access"] = str(refresh.access_token),
+        response_data = get_login_response_data(user)
 
         return custom_response(
             status.HTTP_200_OK,
@@ -166,12 +175,16 @@ class GetUsers(GenericAPIView):
         ## if I pass page_size in PARM, 
         URL : http://127.0.0.1:8000/api/get_user/?page_size=2
 
+        ## pages are cursor based, follow the `next`/`previous` links to move between pages.
+        ## "count" is only returned when with_count=true is passed.
+        URL : http://127.0.0.1:8000/api/get_user/?page_size=2&with_count=true
+
         Response:
         {
             "status_code": 200,
             "error": false,
             "links": {
-                "next": "http://127.0.0.1:8000/api/get_user/?page=2&page_size=2",
+                "next": "http://127.0.0.1:8000/api/get_user/?cursor=eyJ2IjpbMl0sInIiOmZhbHNlfQ%3D%3D&page_size=2&with_count=true",
                 "previous": null
             },
             "count": 12,
@@ -188,6 +201,9 @@ class GetUsers(GenericAPIView):
             "message": ""
         }
 
+        ## pass include_mutual_friends=true to add "mutual_friends_count" to every user.
+        URL : http://127.0.0.1:8000/api/get_user/?include_mutual_friends=true
+
         ## when I will pass search parameter in PARAM.
 
         URL : http://127.0.0.1:8000/api/get_user/?search=raj@gmail.com
@@ -200,7 +216,6 @@ class GetUsers(GenericAPIView):
                 "next": null,
                 "previous": null
             },
-            "count": 1,
             "data": [
                 {
                     "username": rajraut,
@@ -222,7 +237,6 @@ class GetUsers(GenericAPIView):
                 "next": null,
                 "previous": null
             },
-            "count": 3,
             "data": [
                 {
                     "username": rajraut,
@@ -246,13 +260,25 @@ class GetUsers(GenericAPIView):
 
         get_page_size = request.GET.get('page_size', None)
         search = request.GET.get('search',None)
+        # mutual_friends_count is opt-in, computed for the whole page in one query
+        context = {
+            'user': request.user,
+            'include_mutual_friends': request.GET.get('include_mutual_friends') == 'true' and request.user.is_authenticated,
+        }
         
         # retrive those records is_active = True
         queryset = self.model.objects.filter(is_active=True)
+        ordering = ('user_id',)
 
-        # filter records based on email or username
+        # Users blocked by or blocking the requesting user are never listed
+        if request.user.is_authenticated:
+            queryset = exclude_blocked(queryset, request.user.user_id)
+
+        # filter records based on email or username through the trigram index,
+        # best matches (exact, then prefix) first
         if search:
-            queryset = queryset.filter(Q(email__icontains=search) |Q(username__icontains=search))
+            queryset = search_users(queryset, search)
+            ordering = ('-search_rank', 'user_id')
 
         #return data in pagination
         response = custom_pagination(
@@ -260,8 +286,57 @@ class GetUsers(GenericAPIView):
             request=request,
             serializer_class=self.serializer_class,
             queryset=queryset,
+            context=context,
+            ordering=ordering,
         )
         return custom_response(
             status.HTTP_200_OK, response, error=False,is_pagination=True
         )
 
+
+class UserAutocompleteAPI(GenericAPIView):
+    """
+    Api for prefix autocomplete on username and email.
+    Served from the in-process autocomplete index, GetUsers stays for full search.
+    """
+    permission_classes = [RoleBasedPermission,]
+
+    def get(self,request):
+        """
+        URL : http://127.0.0.1:8000/api/users/autocomplete/?q=ra
+
+        ## limit is optional, 10 by default and AUTOCOMPLETE_MAX_RESULTS at most
+        URL : http://127.0.0.1:8000/api/users/autocomplete/?q=ra&limit=5
+
+        Response:
+        {
+            "status_code": 200,
+            "error": false,
+            "data": [
+                {
+                    "user_id": 6,
+                    "username": "radha",
+                    "email": "radha@gmail.com"
+                },
+                {
+                    "user_id": 3,
+                    "username": "raj",
+                    "email": "raj@gmail.com"
+                }
+            ],
+            "message": ""
+        }
+        """
+        prefix = request.GET.get('q', '').strip()
+        if not prefix:
+            return custom_response(status.HTTP_400_BAD_REQUEST,message='Search prefix is required.')
+
+        try:
+            limit = int(request.GET.get('limit', 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, settings.AUTOCOMPLETE_MAX_RESULTS))
+
+        exclude_ids = get_block_set(request.user.user_id) if request.user.is_authenticated else ()
+        response = autocomplete_index.search(prefix, limit=limit, exclude_ids=exclude_ids)
+        return custom_response(status.HTTP_200_OK, response, error=False)
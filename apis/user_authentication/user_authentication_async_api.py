@@ -0,0 +1,125 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import Throttled
+
+from users_app.custom_authention import aauthenticate
+from users_app.custome_throttle import LoginThrottle
+from users_app.models import User
+from users_app.password_hashing import PasswordHashingSaturated
+from apis.user_authentication.user_authentication_api import get_login_response_data
+from apis.user_authentication.user_authentication_serializer import SignUpSerializer
+from utils.constant import *
+
+
+class AsyncAuthAPIView(View):
+    """
+    Base for the async sign up and login views.
+
+    Served through social_network.asgi the password hash is awaited on the
+    hashing pool, so the event loop keeps handling other requests meanwhile.
+    The views return the same responses as SignUpAPI and UserLoginAPI and are
+    mounted in their place when settings.ASYNC_AUTH_VIEWS is set.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token based like the DRF views, no CSRF cookie involved
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    @staticmethod
+    def get_data(request):
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    @staticmethod
+    def custom_response(status_code, data={}, error=True, message=""):
+        return JsonResponse(
+            {
+                CUSTOM_RESPONSE_STATUS_CODE: status_code,
+                CUSTOM_RESPONSE_ERROR: error,
+                CUSTOM_RESPONSE_DATA: data,
+                CUSTOM_RESPONSE_MESSAGE: message,
+            },
+            status=status_code,
+        )
+
+    @staticmethod
+    def saturated_response(error):
+        response = JsonResponse({"detail": str(error.detail)}, status=error.status_code)
+        response["Retry-After"] = "1"
+        return response
+
+
+class AsyncSignUpAPI(AsyncAuthAPIView):
+    """
+    Async version of SignUpAPI, URL : http://127.0.0.1:8000/api/sign-up/
+    """
+
+    async def post(self, request):
+        data = self.get_data(request)
+        if data is None:
+            return JsonResponse({"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = SignUpSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            user = await User.objects.acreate_user(**serializer.validated_data)
+        except IntegrityError:
+            return JsonResponse(SignUpSerializer.duplicate_email_error, status=status.HTTP_400_BAD_REQUEST)
+        except PasswordHashingSaturated as error:
+            return self.saturated_response(error)
+
+        response_data = {"user_id": user.user_id, "email": user.email}
+        return self.custom_response(
+            status.HTTP_201_CREATED,
+            response_data,
+            error=False,
+            message="User created successfully.",
+        )
+
+
+class AsyncUserLoginAPI(AsyncAuthAPIView):
+    """
+    Async version of UserLoginAPI, URL : http://127.0.0.1:8000/api/login/
+    """
+
+    async def post(self, request):
+        try:
+            await sync_to_async(LoginThrottle().allow_request)(request, self)
+        except Throttled as error:
+            return JsonResponse({"detail": str(error.detail)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        data = self.get_data(request)
+        if data is None:
+            return JsonResponse({"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            user = await aauthenticate(
+                request, username=data.get("email"), password=data.get("password")
+            )
+        except PasswordHashingSaturated as error:
+            return self.saturated_response(error)
+
+        if not user or (not user.is_active):
+            return self.custom_response(
+                status.HTTP_401_UNAUTHORIZED,
+                message="Please check email and password",
+            )
+
+        return self.custom_response(
+            status.HTTP_200_OK,
+            get_login_response_data(user),
+            error=False,
+            message="You successfully logged in",
+        )
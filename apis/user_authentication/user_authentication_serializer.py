@@ -1,24 +1,66 @@
 from rest_framework import serializers
 from users_app.models import User
+from django.db import IntegrityError, transaction
+from users_app.friend_suggestions import get_mutual_friend_counts
 
 class SignUpSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField()
 
-    def validate_email(self, row_email):
-        get_email = User.objects.filter(email__iexact=row_email).exists()
-        if get_email:
-            raise serializers.ValidationError("Email already exist")
-        return row_email
+    duplicate_email_error = {"email": ["Email already exist"]}
 
     def create(self, validated_data):
+        """
+        Creates the user with a single INSERT, a duplicate email (in any case)
+        is caught by the user_email_lower_unique index instead of a pre-check.
+        """
         try:
-            User.objects.create_user(**validated_data)
-        except Exception as e:
-            print(f"{e = }")
-        return User(**validated_data)
+            with transaction.atomic():
+                return User.objects.create_user(**validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(self.duplicate_email_error)
 
-class GetUsersSerializer(serializers.ModelSerializer):
+class MutualFriendsListSerializer(serializers.ListSerializer):
+    """
+    Computes the mutual-friend counts of a whole page in one query before
+    the items are serialized, instead of one query per item.
+    """
+
+    def to_representation(self, data):
+        if self.context.get('include_mutual_friends') and 'mutual_friend_counts' not in self.context:
+            data = list(data)
+            self.context['mutual_friend_counts'] = get_mutual_friend_counts(
+                self.context['user'].user_id, [user.user_id for user in data]
+            )
+        return super().to_representation(data)
+
+
+class MutualFriendsCountMixin(serializers.Serializer):
+    """
+    Opt-in `mutual_friends_count` field for user serializers.
+
+    The field is only present when the context has `include_mutual_friends`
+    set, the requesting user is read from `context['user']`.
+    Use with `list_serializer_class = MutualFriendsListSerializer`.
+    """
+    mutual_friends_count = serializers.SerializerMethodField()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('include_mutual_friends'):
+            fields.pop('mutual_friends_count', None)
+        return fields
+
+    def get_mutual_friends_count(self, obj):
+        mutual_friend_counts = self.context.get('mutual_friend_counts')
+        if mutual_friend_counts is None:
+            # Serialized on its own, not through MutualFriendsListSerializer
+            mutual_friend_counts = get_mutual_friend_counts(self.context['user'].user_id, [obj.user_id])
+        return mutual_friend_counts.get(obj.user_id, 0)
+
+
+class GetUsersSerializer(MutualFriendsCountMixin, serializers.ModelSerializer):
     class Meta:
         model = User
-        fields=('user_id','username','email')
+        fields=('user_id','username','email','mutual_friends_count')
+        list_serializer_class = MutualFriendsListSerializer
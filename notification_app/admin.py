@@ -1,4 +1,7 @@
 from django.contrib import admin
-from notification_app.models import Notification
+from notification_app.models import Notification,NotificationOutbox,NotificationCounter,NotificationArchive
 # Register your models here.
-admin.site.register(Notification)
\ No newline at end of file
+admin.site.register(Notification)
+admin.site.register(NotificationOutbox)
+admin.site.register(NotificationCounter)
+admin.site.register(NotificationArchive)
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from utils.cache_utils import is_shared_cache
+
+from apis.notification.notification_serializer import NotificationSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessBroker:
+    """
+    Pub/sub broker for the notification stream, local to one worker process.
+
+    Every connected stream owns an asyncio queue on the event loop it runs
+    on. `publish` can be called from any thread (signals run on request
+    threads) and hands the event over with `call_soon_threadsafe`.
+    Only streams connected to the same process receive the event.
+    """
+
+    cross_process = False
+    queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> {(loop, queue), ...}
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, event)
+
+    @staticmethod
+    def _put(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass  # Slow client, the event is still in the notification list
+
+    async def listen(self, user_id, heartbeat):
+        """
+        Yields the events published for `user_id`, or None every `heartbeat`
+        seconds without events so the caller can keep the connection alive.
+        """
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber[1].get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(user_id, set())
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(user_id, None)
+
+
+class CacheBroker(InProcessBroker):
+    """
+    Cross-worker broker that uses the Django cache as a short per-user event log.
+
+    `publish` appends the event under an atomically incremented sequence
+    number. Each process runs a single poller that reads the sequence
+    numbers of all its connected users in one `get_many` every
+    NOTIFICATION_STREAM_POLL_INTERVAL, fetches the new events in another
+    and fans them out to the local streams. The cache load is per process,
+    not per connection. Events reach streams in every worker as long as the
+    cache is shared (database, Redis, Memcached), see `is_cross_process_broker`.
+    """
+
+    cross_process = True
+    event_timeout = 60  # Seconds an event stays readable in the log
+
+    def __init__(self):
+        super().__init__()
+        self._sequences = {}  # user_id -> last sequence number delivered in this process
+        self._poller = None
+
+    def get_sequence_key(self, user_id):
+        return f"notification_stream_seq_{user_id}"
+
+    def get_event_key(self, user_id, sequence):
+        return f"notification_stream_{user_id}_{sequence}"
+
+    def publish(self, user_id, event):
+        sequence_key = self.get_sequence_key(user_id)
+        cache.add(sequence_key, 0, timeout=None)
+        sequence = cache.incr(sequence_key)
+        cache.set(self.get_event_key(user_id, sequence), event, timeout=self.event_timeout)
+
+    async def listen(self, user_id, heartbeat):
+        sequence = await cache.aget(self.get_sequence_key(user_id), 0)
+        with self._lock:
+            # Other streams of the user may already be further along
+            self._sequences.setdefault(user_id, sequence)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+        events = super().listen(user_id, heartbeat)
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+
+    async def _poll(self):
+        poll_interval = settings.NOTIFICATION_STREAM_POLL_INTERVAL
+        while True:
+            await asyncio.sleep(poll_interval)
+            with self._lock:
+                for user_id in set(self._sequences) - set(self._subscribers):
+                    del self._sequences[user_id]
+                last_sequences = dict(self._sequences)
+            if not last_sequences:
+                continue
+            try:
+                await self._deliver(last_sequences)
+            except Exception:
+                logger.exception("Notification stream poll failed")
+
+    async def _deliver(self, last_sequences):
+        sequence_keys = {self.get_sequence_key(user_id): user_id for user_id in last_sequences}
+        sequences = await cache.aget_many(list(sequence_keys))
+        event_keys = []
+        for sequence_key, sequence in sequences.items():
+            user_id = sequence_keys[sequence_key]
+            if sequence <= last_sequences[user_id]:
+                continue
+            for number in range(last_sequences[user_id] + 1, sequence + 1):
+                event_keys.append((user_id, self.get_event_key(user_id, number)))
+            with self._lock:
+                if user_id in self._sequences:
+                    self._sequences[user_id] = sequence
+        if not event_keys:
+            return
+
+        events = await cache.aget_many([event_key for _, event_key in event_keys])
+        for user_id, event_key in event_keys:
+            if event_key in events:
+                super().publish(user_id, events[event_key])
+
+
+_broker = None
+
+
+def get_broker():
+    """
+    Returns the broker configured in settings.NOTIFICATION_BROKER_BACKEND.
+    """
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.NOTIFICATION_BROKER_BACKEND)()
+    return _broker
+
+
+def is_cross_process_broker():
+    """
+    Tells whether events published in one process reach the streams of the others.
+    """
+    return get_broker().cross_process and is_shared_cache()
+
+
+def publish_notification(notification):
+    """
+    Publishes a notification to its recipient's streams, call it after commit.
+    `from_user` and `to_user` should be loaded (select_related) to avoid extra queries.
+    """
+    event = dict(
+        NotificationSerializer(notification).data,
+        notification_id=notification.notification_id,
+    )
+    get_broker().publish(notification.to_user_id, event)
@@ -0,0 +1,140 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from notification_app.models import Notification, NotificationCounter
+
+
+def get_unread_count(user_id):
+    """
+    Returns the unread notification count of a user with a primary-key lookup.
+    """
+    unread_count = (
+        NotificationCounter.objects.filter(user_id=user_id)
+        .values_list("unread_count", flat=True)
+        .first()
+    )
+    return unread_count or 0
+
+
+def increment_unread_counts(unread_counts):
+    """
+    Atomically adds to the unread counters.
+
+    Args:
+        unread_counts (dict): {user_id: number of new unread notifications}
+    """
+    for user_id, count in unread_counts.items():
+        updated = NotificationCounter.objects.filter(user_id=user_id).update(
+            unread_count=F("unread_count") + count
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                NotificationCounter.objects.create(user_id=user_id, unread_count=count)
+        except IntegrityError:
+            # Created concurrently, add on top of it
+            NotificationCounter.objects.filter(user_id=user_id).update(
+                unread_count=F("unread_count") + count
+            )
+
+
+def decrement_unread_count(user_id, count):
+    """
+    Atomically subtracts from a user's unread counter, never below zero.
+    """
+    if count:
+        NotificationCounter.objects.filter(user_id=user_id).update(
+            unread_count=Greatest(F("unread_count") - count, Value(0))
+        )
+
+
+def decrement_unread_counts(unread_counts):
+    """
+    Atomically subtracts from several unread counters with a single UPDATE,
+    never below zero.
+
+    Args:
+        unread_counts (dict): {user_id: number of unread notifications removed}
+    """
+    unread_counts = {user_id: count for user_id, count in unread_counts.items() if count}
+    if not unread_counts:
+        return
+    removed = Case(
+        *[When(user_id=user_id, then=Value(count)) for user_id, count in unread_counts.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    NotificationCounter.objects.filter(user_id__in=unread_counts).update(
+        unread_count=Greatest(F("unread_count") - removed, Value(0))
+    )
+
+
+def mark_notifications_read(user_id, read_at, up_to=None):
+    """
+    Marks the user's unread notifications as read with a single UPDATE.
+
+    Args:
+        user_id (int): Recipient of the notifications.
+        read_at (datetime): Time stored in `read_at`.
+        up_to (datetime, optional): Only notifications created at or before it.
+
+    Returns:
+        int: Number of notifications marked as read.
+    """
+    notifications = Notification.objects.filter(to_user_id=user_id, read_at__isnull=True)
+    if up_to is not None:
+        notifications = notifications.filter(created_at__lte=up_to)
+
+    with transaction.atomic():
+        marked = notifications.update(read_at=read_at)
+        if up_to is None:
+            # Everything is read, reset instead of subtracting
+            NotificationCounter.objects.filter(user_id=user_id).update(unread_count=0)
+        else:
+            decrement_unread_count(user_id, marked)
+    return marked
+
+
+def reconcile_unread_counts(start_user_id, end_user_id):
+    """
+    Recomputes the counters of users in [start_user_id, end_user_id) from
+    the notifications and fixes the ones that drifted.
+
+    Returns:
+        int: Number of counters that were repaired.
+    """
+    actual_counts = dict(
+        Notification.objects.filter(
+            read_at__isnull=True,
+            to_user_id__gte=start_user_id,
+            to_user_id__lt=end_user_id,
+        )
+        .values("to_user_id")
+        .annotate(unread_count=Count("notification_id"))
+        .values_list("to_user_id", "unread_count")
+    )
+    counters = {
+        counter.user_id: counter
+        for counter in NotificationCounter.objects.filter(
+            user_id__gte=start_user_id, user_id__lt=end_user_id
+        )
+    }
+
+    drifted = []
+    for user_id, counter in counters.items():
+        unread_count = actual_counts.get(user_id, 0)
+        if counter.unread_count != unread_count:
+            counter.unread_count = unread_count
+            drifted.append(counter)
+    missing = [
+        NotificationCounter(user_id=user_id, unread_count=unread_count)
+        for user_id, unread_count in actual_counts.items()
+        if user_id not in counters
+    ]
+
+    with transaction.atomic():
+        NotificationCounter.objects.bulk_update(drifted, ["unread_count"])
+        NotificationCounter.objects.bulk_create(missing, ignore_conflicts=True)
+    return len(drifted) + len(missing)
@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notification_app.broker import is_cross_process_broker
+from notification_app.outbox import process_outbox_batch
+from notification_app.partitions import ensure_notification_partitions
+
+# Seconds between checks that the notification partitions exist
+PARTITION_CHECK_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    """
+    Deliver pending notification outbox events.
+
+    The notifications are published to the streams from this process. When
+    the broker can't reach the web workers (no CacheBroker on a shared
+    cache), the notifications are still created but not published.
+
+    It is the only writer of notifications, so it also creates the upcoming
+    monthly partitions on PostgreSQL, whether or not the retention job runs.
+
+    Usage:
+        python manage.py process_notification_outbox
+        python manage.py process_notification_outbox --loop --sleep 1
+    """
+
+    help = "Turn pending notification outbox events into notifications in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.NOTIFICATION_OUTBOX_BATCH_SIZE,
+            help="Number of events delivered per batch.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and poll for new events.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the outbox is empty (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        publish = is_cross_process_broker()
+        if not publish:
+            self.stderr.write(
+                self.style.WARNING(
+                    "Notifications published by this worker would never reach the streams "
+                    "of the web workers, they are created without being published. Use "
+                    "notification_app.broker.CacheBroker as NOTIFICATION_BROKER_BACKEND "
+                    "with a shared cache (CACHE_URL) for real-time notifications."
+                )
+            )
+
+        batch_size = options["batch_size"]
+        total = 0
+        partitions_checked_at = None
+
+        while True:
+            if partitions_checked_at is None or time.monotonic() - partitions_checked_at >= PARTITION_CHECK_INTERVAL:
+                ensure_notification_partitions(settings.NOTIFICATION_PARTITIONS_AHEAD)
+                partitions_checked_at = time.monotonic()
+            processed = process_outbox_batch(batch_size, publish=publish)
+            total += processed
+            if processed:
+                self.stdout.write(f"Processed {total} outbox events.")
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"Outbox drained ({total} events)."))
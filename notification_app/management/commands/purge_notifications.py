@@ -0,0 +1,97 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notification_app.partitions import (
+    drop_notification_partitions,
+    ensure_notification_partitions,
+)
+from notification_app.retention import get_retention_cutoff, purge_notifications_batch
+
+
+class Command(BaseCommand):
+    """
+    Archive and delete notifications older than the retention age.
+
+    On PostgreSQL it also creates the upcoming monthly partitions of the
+    notification table and drops the expired partitions once they are empty.
+
+    Usage:
+        python manage.py purge_notifications
+        python manage.py purge_notifications --days 90 --no-archive
+        python manage.py purge_notifications --loop --interval 3600
+    """
+
+    help = "Archive and delete expired notifications in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.NOTIFICATION_RETENTION_DAYS,
+            help="Notifications older than this many days are purged.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.NOTIFICATION_RETENTION_BATCH_SIZE,
+            help="Number of notifications purged per batch.",
+        )
+        parser.add_argument(
+            "--archive",
+            action="store_true",
+            default=settings.NOTIFICATION_RETENTION_ARCHIVE,
+            help="Copy notifications to the archive table before deleting them.",
+        )
+        parser.add_argument(
+            "--no-archive",
+            action="store_false",
+            dest="archive",
+            help="Delete notifications without archiving them.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to wait between batches, to spread the load.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and purge again every --interval seconds.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=3600,
+            help="Seconds between runs (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.purge(options)
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def purge(self, options):
+        ensure_notification_partitions(settings.NOTIFICATION_PARTITIONS_AHEAD)
+        before = get_retention_cutoff(options["days"])
+        total = 0
+
+        while True:
+            purged = purge_notifications_batch(
+                before, options["batch_size"], archive=options["archive"]
+            )
+            if not purged:
+                break
+            total += purged
+            self.stdout.write(f"Purged {total} notifications.")
+            time.sleep(options["sleep"])
+
+        for partition in drop_notification_partitions(before):
+            self.stdout.write(f"Dropped partition {partition}.")
+        self.stdout.write(
+            self.style.SUCCESS(f"Purged {total} notifications created before {before:%Y-%m-%d %H:%M}.")
+        )
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from notification_app.counters import reconcile_unread_counts
+
+
+class Command(BaseCommand):
+    """
+    Repair drift between unread notification counters and the notifications.
+
+    Usage:
+        python manage.py reconcile_notification_counters
+        python manage.py reconcile_notification_counters --batch-size 5000
+    """
+
+    help = "Recompute unread notification counters in user-id ranges and fix drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Size of the user-id range reconciled per batch.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        max_user_id = get_user_model().objects.aggregate(max_user_id=Max("user_id"))["max_user_id"] or 0
+        repaired = 0
+
+        for start_user_id in range(0, max_user_id + 1, batch_size):
+            repaired += reconcile_unread_counts(start_user_id, start_user_id + batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} unread counters."))
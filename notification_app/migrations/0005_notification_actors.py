@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notification_app", "0004_notificationcounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="actor_count",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="actor_ids",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
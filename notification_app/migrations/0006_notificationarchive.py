@@ -0,0 +1,57 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notification_app", "0005_notification_actors"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationArchive",
+            fields=[
+                (
+                    "notification_archive_id",
+                    models.BigAutoField(primary_key=True, serialize=False),
+                ),
+                ("notification_id", models.IntegerField(unique=True)),
+                (
+                    "notification_type",
+                    models.CharField(
+                        choices=[
+                            ("friend_request_sent", "friend_request_sent"),
+                            ("friend_request_accepted", "friend_request_accepted"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                ("actor_ids", models.JSONField(blank=True, default=list)),
+                ("actor_count", models.PositiveIntegerField(default=1)),
+                ("read_at", models.DateTimeField(blank=True, null=True)),
+                ("notification_created_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "from_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notification_archive_from_user_model_manager",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "to_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notification_archive_to_user_model_manager",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+    ]
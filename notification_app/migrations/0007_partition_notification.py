@@ -0,0 +1,138 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import migrations
+
+# Monthly partitions created ahead of the current month during the migration,
+# afterwards `manage.py purge_notifications` keeps creating them. The values
+# and helpers below are frozen copies of notification_app.partitions, so
+# later changes there don't change what this migration does.
+PARTITIONS_AHEAD = 2
+PARTITION_SUFFIX = "_p"
+
+
+def get_month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month_start, months):
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_partition_bound(month_start):
+    return datetime(
+        month_start.year, month_start.month, 1, tzinfo=dt_timezone.utc
+    ).isoformat()
+
+
+def create_month_partition(cursor, quote, parent_table, table, month_start):
+    """
+    Creates the partition of one month under `parent_table`, named after the
+    final `table` name (<table>_pYYYYMM) so it matches the partitions the
+    retention job creates, lists and drops after the rename.
+    """
+    partition = f"{table}{PARTITION_SUFFIX}{month_start:%Y%m}"
+    cursor.execute(
+        f"CREATE TABLE {quote(partition)} PARTITION OF {quote(parent_table)} "
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [get_partition_bound(month_start), get_partition_bound(add_months(month_start, 1))],
+    )
+
+
+def partition_notification_table(apps, schema_editor):
+    """
+    Turns the notification table into a table range-partitioned by month on
+    created_at (PostgreSQL only, other databases keep the plain table).
+
+    PostgreSQL requires the partition key in the primary key, so the primary
+    key becomes (notification_id, created_at) and the database no longer
+    enforces that notification_id alone is unique. It stays unique because
+    every id is drawn from a single sequence, which is moved over with the
+    current value: never insert a notification with an explicit id. The
+    rows are copied into the new table, which then takes over the original
+    name, indexes and foreign keys.
+
+    There is no DEFAULT partition: rows in it would make every later
+    CREATE TABLE ... PARTITION OF for their month fail. The outbox worker
+    and the retention job create the partitions ahead of time instead.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    Notification = apps.get_model("notification_app", "Notification")
+    User = apps.get_model("users_app", "User")
+    quote = schema_editor.quote_name
+    table = Notification._meta.db_table
+    new_table = f"{table}_partitioned"
+    sequence = f"{table}_notification_id_seq"
+    user_table = quote(User._meta.db_table)
+    user_pk = quote(User._meta.pk.column)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {quote(new_table)} (LIKE {quote(table)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(new_table)} "
+            f"ADD CONSTRAINT {quote(table + '_pkey_partitioned')} "
+            f"PRIMARY KEY (notification_id, created_at)"
+        )
+
+        # One partition per month holding rows, plus the months ahead
+        cursor.execute(f"SELECT MIN(created_at) FROM {quote(table)}")
+        oldest = cursor.fetchone()[0]
+        month_start = get_month_start(oldest or date.today())
+        last_month_start = add_months(get_month_start(date.today()), PARTITIONS_AHEAD)
+        while month_start <= last_month_start:
+            create_month_partition(cursor, quote, new_table, table, month_start)
+            month_start = add_months(month_start, 1)
+        cursor.execute(f"INSERT INTO {quote(new_table)} SELECT * FROM {quote(table)}")
+        cursor.execute(f"DROP TABLE {quote(table)} CASCADE")
+        cursor.execute(f"ALTER TABLE {quote(new_table)} RENAME TO {quote(table)}")
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} RENAME CONSTRAINT "
+            f"{quote(table + '_pkey_partitioned')} TO {quote(table + '_pkey')}"
+        )
+
+        # The identity sequence went away with the old table, continue from the highest id
+        cursor.execute(f"CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.notification_id")
+        cursor.execute(
+            f"SELECT setval(%s, COALESCE(MAX(notification_id), 0) + 1, false) FROM {quote(table)}",
+            [sequence],
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ALTER COLUMN notification_id "
+            f"SET DEFAULT nextval(%s::regclass)",
+            [sequence],
+        )
+
+        # Indexes and foreign keys are created on the parent and cascade to the partitions
+        cursor.execute(
+            f"CREATE INDEX {quote('notification_to_user_created')} "
+            f"ON {quote(table)} (to_user_id, created_at DESC)"
+        )
+        cursor.execute(
+            f"CREATE INDEX {quote(table + '_from_user_id')} ON {quote(table)} (from_user_id)"
+        )
+        for column in ("from_user_id", "to_user_id"):
+            cursor.execute(
+                f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(f'{table}_{column}_fk')} "
+                f"FOREIGN KEY ({column}) REFERENCES {user_table} ({user_pk}) "
+                f"DEFERRABLE INITIALLY DEFERRED"
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notification_app", "0006_notificationarchive"),
+        ("users_app", "0006_usersearchgram"),
+    ]
+
+    operations = [
+        # Not reversible on PostgreSQL: the partitioned table keeps working
+        # with the previous schema, so reversing leaves it in place.
+        migrations.RunPython(partition_notification_table, migrations.RunPython.noop),
+    ]
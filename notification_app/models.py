@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from users_app.models import BaseModleMixin,User
 # Create your models here.
 class Notification(BaseModleMixin):
@@ -9,6 +11,9 @@ class Notification(BaseModleMixin):
         
     ]
 
+    # On PostgreSQL the table is partitioned and the real primary key is
+    # (notification_id, created_at), ids are only unique because they all
+    # come from the sequence (see migration 0007)
     notification_id = models.AutoField(primary_key=True,null=False,blank=False)
     notification_type = models.CharField(max_length=100,choices=NOTIFICATION_TYPES,blank=False, null=False)
     from_user = models.ForeignKey(
@@ -26,7 +31,133 @@ class Notification(BaseModleMixin):
         null=False,
     )
     read_at = models.DateTimeField(null=True, blank=True)
+    # Coalesced notifications: `from_user` is the latest actor, `actor_ids`
+    # the most recent actors (capped) and `actor_count` all distinct actors.
+    actor_ids = models.JSONField(default=list, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user, newest-first notification list
+            models.Index(fields=['to_user', '-created_at'], name='notification_to_user_created'),
+        ]
+
+    def get_actor_ids(self):
+        """
+        Returns the stored actor ids, most recent first.
+        Notifications created before coalescing only have `from_user`.
+        """
+        return self.actor_ids or [self.from_user_id]
+
+    def add_actor(self, user_id):
+        """
+        Moves `user_id` to the front of the actors, counting them when new.
+        Actors that fell off the capped list are counted again, so
+        `actor_count` can slightly overcount very large groups.
+        """
+        actor_ids = self.get_actor_ids()
+        if user_id in actor_ids:
+            actor_ids.remove(user_id)
+        else:
+            self.actor_count += 1
+        self.actor_ids = [user_id, *actor_ids][:settings.NOTIFICATION_GROUP_MAX_ACTORS]
+        self.from_user_id = user_id
 
     def __str__(self):
         return f"Notification ID : {self.notification_id} -> Notification Type : {self.notification_type} -> To User ID : {self.to_user.user_id} -> From User ID : {self.from_user.user_id}"
 
+
+class NotificationOutbox(BaseModleMixin):
+    """
+    Transactional outbox for notifications.
+
+    Signals record one event row in the same transaction as the change that
+    caused it (e.g. FriendRequest.save), and the process_notification_outbox
+    worker turns pending events into Notification rows in batches.
+    Delivered events are deleted, events that keep failing are marked failed.
+    """
+
+    OUTBOX_STATUS = [
+        ('pending', 'pending'),
+        ('failed', 'failed'),
+    ]
+
+    notification_outbox_id = models.AutoField(primary_key=True,null=False,blank=False)
+    notification_type = models.CharField(max_length=100,choices=Notification.NOTIFICATION_TYPES,blank=False, null=False)
+    from_user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_outbox_from_user_model_manager',
+    )
+    to_user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_outbox_to_user_model_manager',
+    )
+    status = models.CharField(max_length=10,choices=OUTBOX_STATUS,default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Serves the worker's "pending and due" scan
+            models.Index(fields=['status', 'available_at'], name='notification_outbox_due'),
+        ]
+
+    def __str__(self):
+        return f"Outbox ID : {self.notification_outbox_id} -> Notification Type : {self.notification_type} -> To User ID : {self.to_user_id} -> Status : {self.status}"
+
+
+class NotificationCounter(BaseModleMixin):
+    """
+    Unread notification count per user, read in O(1) by primary key.
+
+    Updated atomically with F() expressions when notifications are created
+    by the outbox worker and when they are marked as read. The
+    reconcile_notification_counters command repairs any drift.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter_user_model_manager',
+    )
+    unread_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"User ID : {self.user_id} -> Unread Count : {self.unread_count}"
+
+
+class NotificationArchive(models.Model):
+    """
+    Notifications moved out of the live table by the retention job.
+
+    Rows keep the original ids and timestamps, `archived_at` is when the
+    notification was archived.
+    """
+    notification_archive_id = models.BigAutoField(primary_key=True,null=False,blank=False)
+    notification_id = models.IntegerField(unique=True)
+    notification_type = models.CharField(max_length=100,choices=Notification.NOTIFICATION_TYPES,blank=False, null=False)
+    from_user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_archive_from_user_model_manager',
+        blank=False,
+        null=False,
+    )
+    to_user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_archive_to_user_model_manager',
+        blank=False,
+        null=False,
+    )
+    actor_ids = models.JSONField(default=list, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+    read_at = models.DateTimeField(null=True, blank=True)
+    notification_created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Notification Archive ID : {self.notification_archive_id} -> Notification ID : {self.notification_id}"
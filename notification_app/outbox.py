@@ -0,0 +1,148 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from notification_app.broker import publish_notification
+from notification_app.counters import increment_unread_counts
+from notification_app.models import Notification, NotificationOutbox
+
+
+def deliver_events(events):
+    """
+    Turns outbox events into notifications, coalescing them per recipient.
+
+    Events with the same (notification_type, to_user) are merged into the
+    recipient's latest unread notification of that type when it was created
+    less than NOTIFICATION_GROUP_WINDOW ago ("Raj and 41 others ..."), otherwise they
+    start a new notification. Costs one SELECT, one bulk UPDATE and one bulk
+    INSERT for the whole batch, plus one counter update per recipient.
+
+    Returns:
+        list: IDs of the created or updated notifications.
+    """
+    now = timezone.now()
+    # Actors per group in delivery order, the latest actor last
+    actors = {}
+    for event in sorted(events, key=lambda event: event.notification_outbox_id):
+        key = (event.notification_type, event.to_user_id)
+        actors.setdefault(key, []).append(event.from_user_id)
+
+    # Open groups for the batch, the newest one per key wins
+    open_groups = {}
+    notifications = Notification.objects.filter(
+        notification_type__in={key[0] for key in actors},
+        to_user_id__in={key[1] for key in actors},
+        read_at__isnull=True,
+        created_at__gte=now - timedelta(seconds=settings.NOTIFICATION_GROUP_WINDOW),
+    ).order_by('created_at')
+    for notification in notifications:
+        open_groups[(notification.notification_type, notification.to_user_id)] = notification
+
+    updated = []
+    created = []
+    for key, actor_ids in actors.items():
+        notification = open_groups.get(key)
+        if notification is None:
+            notification_type, to_user_id = key
+            notification = Notification(
+                notification_type=notification_type,
+                to_user_id=to_user_id,
+                from_user_id=actor_ids[0],
+                actor_ids=[actor_ids[0]],
+            )
+            created.append(notification)
+        else:
+            updated.append(notification)
+        for actor_id in actor_ids:
+            notification.add_actor(actor_id)
+        # created_at stays fixed so the group closes after the window (and
+        # keeps its partition), the latest activity is in updated_at
+        notification.updated_at = now
+
+    Notification.objects.bulk_update(
+        updated, ['from_user', 'actor_ids', 'actor_count', 'updated_at']
+    )
+    Notification.objects.bulk_create(created)
+
+    # Only new notifications add to the unread count, open groups are already unread
+    unread_counts = Counter(notification.to_user_id for notification in created)
+    increment_unread_counts(unread_counts)
+    return [notification.notification_id for notification in updated + created]
+
+
+def publish_notifications(notification_ids):
+    notifications = Notification.objects.filter(
+        notification_id__in=notification_ids
+    ).select_related('from_user', 'to_user')
+    for notification in notifications:
+        publish_notification(notification)
+
+
+def retry_later(events, error):
+    """
+    Schedules failed events again with exponential backoff, events that ran
+    out of attempts are marked failed and kept for inspection.
+    """
+    now = timezone.now()
+    for event in events:
+        event.attempts += 1
+        event.last_error = str(error)
+        event.updated_at = now
+        if event.attempts >= settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS:
+            event.status = 'failed'
+        else:
+            event.available_at = now + timedelta(seconds=2 ** event.attempts)
+    NotificationOutbox.objects.bulk_update(
+        events, ['attempts', 'last_error', 'status', 'available_at', 'updated_at']
+    )
+
+
+def process_outbox_batch(batch_size, publish=True):
+    """
+    Drains one batch of due outbox events.
+
+    The notifications are published to the streams after commit unless
+    `publish` is False, when no stream could receive them from this process.
+
+    Events are locked with SELECT ... FOR UPDATE SKIP LOCKED so several
+    workers can drain the outbox side by side (the lock is a no-op on SQLite).
+    When the batch fails as a whole, each event is retried on its own so one
+    bad event doesn't hold the others back.
+
+    Returns:
+        int: Number of events taken from the outbox.
+    """
+    with transaction.atomic():
+        events = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', available_at__lte=timezone.now())
+            .order_by('notification_outbox_id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        try:
+            with transaction.atomic():
+                notification_ids = deliver_events(events)
+            delivered = events
+        except Exception:
+            # Find the bad events one by one
+            notification_ids = []
+            delivered = []
+            for event in events:
+                try:
+                    with transaction.atomic():
+                        notification_ids += deliver_events([event])
+                    delivered.append(event)
+                except Exception as error:
+                    retry_later([event], error)
+
+        NotificationOutbox.objects.filter(
+            notification_outbox_id__in=[event.notification_outbox_id for event in delivered]
+        ).delete()
+        if publish:
+            transaction.on_commit(lambda: publish_notifications(notification_ids))
+    return len(events)
@@ -0,0 +1,119 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import connection
+
+from notification_app.models import Notification
+
+# Monthly partitions are named <table>_pYYYYMM
+PARTITION_SUFFIX = "_p"
+
+
+def get_month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month_start, months):
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_partition_name(table, month_start):
+    return f"{table}{PARTITION_SUFFIX}{month_start:%Y%m}"
+
+
+def get_partition_bound(month_start):
+    return datetime(
+        month_start.year, month_start.month, 1, tzinfo=dt_timezone.utc
+    ).isoformat()
+
+
+def create_month_partition(cursor, table, month_start):
+    """
+    Creates the partition of `table` holding the rows of one month, if missing.
+    """
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table} "
+        "FOR VALUES FROM (%s) TO (%s)".format(
+            partition=connection.ops.quote_name(get_partition_name(table, month_start)),
+            table=connection.ops.quote_name(table),
+        ),
+        [get_partition_bound(month_start), get_partition_bound(add_months(month_start, 1))],
+    )
+
+
+def is_partitioned(cursor, table):
+    """
+    Tells whether `table` is a partitioned PostgreSQL table.
+    """
+    if connection.vendor != "postgresql":
+        return False
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+        [table],
+    )
+    return cursor.fetchone() is not None
+
+
+def get_month_partitions(cursor, table):
+    """
+    Returns {month_start: partition_name} of the monthly partitions of `table`.
+    """
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(%s)",
+        [table],
+    )
+    prefix = f"{table}{PARTITION_SUFFIX}"
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and suffix.isdigit() and len(suffix) == 6:
+            partitions[date(int(suffix[:4]), int(suffix[4:]), 1)] = name
+    return partitions
+
+
+def ensure_notification_partitions(months_ahead, today=None):
+    """
+    Creates the partitions of the current month and `months_ahead` next months,
+    there is no default partition to catch notifications of a missing month.
+    No-op unless the notification table is partitioned.
+
+    Returns:
+        int: Number of partitions that exist for the covered months.
+    """
+    table = Notification._meta.db_table
+    month_start = get_month_start(today or date.today())
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor, table):
+            return 0
+        for months in range(months_ahead + 1):
+            create_month_partition(cursor, table, add_months(month_start, months))
+    return months_ahead + 1
+
+
+def drop_notification_partitions(before):
+    """
+    Drops the empty monthly partitions that end on or before `before`.
+    The retention job empties them batch by batch first, so archiving and
+    unread counters stay correct. No-op unless the table is partitioned.
+
+    Returns:
+        list: Names of the dropped partitions.
+    """
+    table = Notification._meta.db_table
+    dropped = []
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor, table):
+            return dropped
+        for month_start, name in sorted(get_month_partitions(cursor, table).items()):
+            month_end = add_months(month_start, 1)
+            if datetime(month_end.year, month_end.month, 1, tzinfo=dt_timezone.utc) > before:
+                break
+            quoted_name = connection.ops.quote_name(name)
+            cursor.execute(f"SELECT 1 FROM {quoted_name} LIMIT 1")
+            if cursor.fetchone() is not None:
+                continue
+            cursor.execute(f"DROP TABLE {quoted_name}")
+            dropped.append(name)
+    return dropped
@@ -0,0 +1,71 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from notification_app.counters import decrement_unread_count
+from notification_app.models import Notification, NotificationArchive
+
+
+def get_retention_cutoff(days):
+    """
+    Returns the datetime before which notifications are expired.
+    """
+    return timezone.now() - timedelta(days=days)
+
+
+def purge_notifications_batch(before, batch_size, archive=True):
+    """
+    Archives (optionally) and deletes one batch of notifications created before `before`.
+
+    The oldest rows are locked with SELECT ... FOR UPDATE SKIP LOCKED, so
+    several runs can work side by side, copied to NotificationArchive with
+    one bulk INSERT and deleted with one DELETE. The unread counters of the
+    recipients lose the unread notifications that were removed. On a
+    partitioned table the `created_at` filter keeps every statement on the
+    old partitions.
+
+    Returns:
+        int: Number of notifications removed, 0 when nothing is left to purge.
+    """
+    with transaction.atomic():
+        notifications = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(created_at__lt=before)
+            .order_by("created_at", "notification_id")[:batch_size]
+        )
+        if not notifications:
+            return 0
+
+        if archive:
+            NotificationArchive.objects.bulk_create(
+                [
+                    NotificationArchive(
+                        notification_id=notification.notification_id,
+                        notification_type=notification.notification_type,
+                        from_user_id=notification.from_user_id,
+                        to_user_id=notification.to_user_id,
+                        actor_ids=notification.actor_ids,
+                        actor_count=notification.actor_count,
+                        read_at=notification.read_at,
+                        notification_created_at=notification.created_at,
+                    )
+                    for notification in notifications
+                ],
+                ignore_conflicts=True,
+            )
+
+        Notification.objects.filter(
+            created_at__lt=before,
+            notification_id__in=[notification.notification_id for notification in notifications],
+        ).delete()
+
+        unread_counts = Counter(
+            notification.to_user_id
+            for notification in notifications
+            if notification.read_at is None
+        )
+        for user_id, count in unread_counts.items():
+            decrement_unread_count(user_id, count)
+    return len(notifications)
@@ -3,6 +3,10 @@ ASGI config for social_network project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this module to use the async notification stream
+(/api/notifications/stream/), e.g.:
+    gunicorn social_network.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
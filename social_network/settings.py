@@ -146,15 +146,100 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users_app.custom_authention.StatelessJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_THROTTLE_RATES": {
         "login": "5/hour",  # Allow 5 login attempts a hour minute
     },
 }
+# Cache shared by every web and worker process: rate limits, invalidations and
+# the notification broker only work across processes with a shared cache.
+# A database table by default (run `python manage.py createcachetable`), set
+# e.g. CACHE_URL=rediscache://127.0.0.1:6379/1 in production. The table
+# allows 300 entries unless max_entries is raised, more would cull the
+# rejection cooldowns and rate limits that are only kept in the cache.
+CACHES = {"default": env.cache_url("CACHE_URL", default="dbcache://django_cache?max_entries=1000000")}
 # cache for 30 minutes
 CACHE_TIMEOUT = 300
+# Expired entries are kept this long and served while one request rebuilds them
+CACHE_STALE_TIMEOUT = 60
+# Upper bound for a single-flight rebuild before other requests build it themselves
+CACHE_REBUILD_LOCK_TIMEOUT = 10
+# Hit/miss/rebuild counters of get_or_rebuild (utils.cache_utils.get_cache_stats),
+# two cache writes per read so only turn it on while measuring
+CACHE_STATS_ENABLED = False
+
+# Cache-backed sliding-window limits (users_app.rate_limiter), same format as DEFAULT_THROTTLE_RATES
+RATE_LIMITS = {
+    "friend_request_send": "3/min",  # requests sent by one user
+    "friend_request_pair": "3/hour",  # requests from one user to the same receiver
+    "user_activity": "60/min",  # activities logged by one user
+    "user_activity_batch": "10/min",  # activity batches logged by one user
+}
+
+# Page-size profiles used by custom_pagination, keys missing from a profile
+# fall back to "default"
+PAGINATION_PROFILES = {
+    "default": {"page_size": 10, "max_page_size": 100},
+    "friends_list": {"page_size": 50, "max_page_size": 100},
+    "user_activity": {"page_size": 20, "max_page_size": 50},
+    "notifications": {"page_size": 20, "max_page_size": 50},
+}
+
+# Friend-of-friend suggestions, top-N kept per user and invalidated on edge changes
+FRIEND_SUGGESTIONS_LIMIT = 50
+FRIEND_SUGGESTIONS_CACHE_TIMEOUT = 3600
+
+# Per-user set of blocked and blocking user ids (users_app.block_cache),
+# dropped by the BlockedUser signals
+BLOCK_SET_CACHE_TIMEOUT = 3600
+BLOCK_SET_LOCAL_CACHE_TIMEOUT = 30  # with a per-process cache (LocMemCache)
+# Users blocked or unblocked per request by the bulk block API
+BLOCK_USERS_BULK_MAX = 1000
+
+# Notification outbox drained by `manage.py process_notification_outbox`
+NOTIFICATION_OUTBOX_BATCH_SIZE = 500
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 5  # failed events are retried with exponential backoff
+
+# Same-type notifications to one recipient are coalesced into a single unread
+# notification ("Raj and 41 others ...") while it is younger than the window
+NOTIFICATION_GROUP_WINDOW = 24 * 60 * 60  # seconds
+NOTIFICATION_GROUP_MAX_ACTORS = 10  # most recent actor ids stored per notification
+
+# Notification retention run by `manage.py purge_notifications`. Notifications
+# older than the retention age are copied to NotificationArchive (when
+# archiving) and deleted in batches. On PostgreSQL the notification table is
+# range-partitioned by month on created_at, see notification_app/partitions.py.
+NOTIFICATION_RETENTION_DAYS = 30
+NOTIFICATION_RETENTION_BATCH_SIZE = 1000
+NOTIFICATION_RETENTION_ARCHIVE = True
+NOTIFICATION_PARTITIONS_AHEAD = 2  # monthly partitions created in advance
+
+# Notification stream (Server-Sent Events, ASGI only).
+# Notifications are published by the outbox worker, so the broker has to reach
+# the web workers: CacheBroker on the shared cache. InProcessBroker only reaches
+# streams of the same process, process_notification_outbox then creates the
+# notifications without publishing them.
+NOTIFICATION_BROKER_BACKEND = "notification_app.broker.CacheBroker"
+NOTIFICATION_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+NOTIFICATION_STREAM_POLL_INTERVAL = 1  # seconds between CacheBroker polls, one poller per process
+
+# In-process buffer behind /api/user-activities/, written with bulk_create by a
+# background thread. Batches that can't be written are spilled to
+# USER_ACTIVITY_SPILL_DIR and replayed later.
+USER_ACTIVITY_BUFFER_SIZE = 10000  # activities held before answering 503
+USER_ACTIVITY_FLUSH_SIZE = 500  # activities per bulk INSERT
+USER_ACTIVITY_FLUSH_INTERVAL = 2  # seconds between time-based flushes
+USER_ACTIVITY_SPILL_DIR = os.path.join(BASE_DIR, "activity_spill")
+USER_ACTIVITY_BATCH_MAX = 100  # activities accepted per batch request
+
+# In-process username/email prefix index behind /api/users/autocomplete/
+AUTOCOMPLETE_SNAPSHOT_PATH = os.path.join(BASE_DIR, "autocomplete_snapshot.json")
+AUTOCOMPLETE_SNAPSHOT_INTERVAL = 300  # seconds between snapshots to disk
+AUTOCOMPLETE_REFRESH_INTERVAL = 30  # seconds between catch-up reads from the database
+AUTOCOMPLETE_RECONCILE_INTERVAL = 600  # seconds between checks for deleted/deactivated users
+AUTOCOMPLETE_MAX_RESULTS = 20
 
 AUTHENTICATION_BACKENDS = [
     "users_app.custom_authention.EmailBackend",
@@ -162,6 +247,28 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 
+# Password hashes (PBKDF2) run on a bounded thread pool, users_app.password_hashing.
+# When all workers are busy and the queue is full, login/sign up answer 503.
+PASSWORD_HASHING_WORKERS = 4
+PASSWORD_HASHING_QUEUE_SIZE = 16
+# Serve /api/login/ and /api/sign-up/ with the async views (deploy with ASGI)
+ASYNC_AUTH_VIEWS = False
+# DRF auth tokens are created lazily by users_app.custom_authention.get_auth_token,
+# set to True to create one with every new user as before
+CREATE_AUTH_TOKEN_ON_SIGNUP = False
+
+# StatelessJWTAuthentication builds request.user from the token claims and
+# only checks the user's token version, cached for this many seconds.
+# Saving the user drops the cached values from the shared cache, other
+# workers see a revocation once their local copy expires. With a per-process
+# cache (LocMemCache) they only see it once their cached value expires.
+AUTH_TOKEN_VERSION_CACHE_TIMEOUT = 300
+# Each process keeps the versions read from the shared cache this many
+# seconds, so most requests don't query the cache table
+AUTH_TOKEN_VERSION_LOCAL_TIMEOUT = 5
+# Full users loaded for tokens issued without the claims
+AUTH_USER_CACHE_TIMEOUT = 60
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=120),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
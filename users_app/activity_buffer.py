@@ -0,0 +1,292 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from users_app.models import UserActivity
+from users_app.rollups import apply_activities_to_rollups
+
+logger = logging.getLogger(__name__)
+
+# Errors caused by the data of a row (a value too long for its column, a user
+# deleted in the meantime), retrying the row can't fix them
+BAD_ROW_ERRORS = (DataError, IntegrityError)
+
+
+class ActivityBufferFull(Exception):
+    """
+    Raised when the buffer can't take more activities, clients should retry later.
+    """
+
+
+class ActivityBuffer:
+    """
+    In-process bounded buffer that writes user activities in batches.
+
+    Requests only append to the buffer, a background thread writes it with
+    `bulk_create` once `flush_size` activities are waiting or every
+    `flush_interval` seconds, whichever comes first.
+
+    - Backpressure: `add` raises ActivityBufferFull instead of growing past
+      `max_size`, the API answers 503 with Retry-After.
+    - Durability: a batch that can't be written (database down or timing
+      out) is spilled to a JSON-lines file in `spill_dir` and replayed by
+      the next successful flush, or by `manage.py replay_activity_spill`.
+      A batch failed by bad rows is written row by row instead, only the
+      bad rows are logged and dropped.
+    - Activities still buffered are flushed at interpreter exit. A killed
+      worker loses what it buffered and had not written yet, up to
+      `max_size` activities when the database was slow or down.
+    """
+
+    def __init__(self, max_size=10000, flush_size=500, flush_interval=2, spill_dir=None):
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.spill_dir = spill_dir
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._activities = deque()
+        self._thread = None
+        self._flush_listeners = []
+
+    def __len__(self):
+        return len(self._activities)
+
+    def add_flush_listener(self, listener):
+        """
+        Registers `listener(activities)`, called with every written batch of
+        UserActivity instances inside the transaction that wrote them.
+        """
+        self._flush_listeners.append(listener)
+
+    def add(self, activities):
+        """
+        Queues activities for writing.
+
+        Args:
+            activities (list): [{"user_id", "activity_type", "details", "timestamp"}, ...]
+
+        Raises:
+            ActivityBufferFull: Not all the activities fit, none of them was queued.
+        """
+        with self._lock:
+            if len(self._activities) + len(activities) > self.max_size:
+                raise ActivityBufferFull()
+            self._activities.extend(activities)
+            is_due = len(self._activities) >= self.flush_size
+        self.start()
+        if is_due:
+            self._flush_requested.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="activity-buffer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Activity buffer flush failed")
+            finally:
+                close_old_connections()
+
+    def _take_batch(self):
+        with self._lock:
+            count = min(self.flush_size, len(self._activities))
+            return [self._activities.popleft() for _ in range(count)]
+
+    def flush(self):
+        """
+        Writes everything buffered so far, then replays spilled files.
+
+        Returns:
+            int: Number of activities written to the database.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                activities = self._take_batch()
+                if not activities:
+                    break
+                try:
+                    written += self.write_batch(activities)
+                except Exception:
+                    logger.exception("Spilled activities to disk")
+                    return written
+            written += self.replay_spill()
+        return written
+
+    def write(self, activities):
+        """
+        Writes a batch with a single bulk INSERT.
+        """
+        instances = [
+            UserActivity(
+                user_id=activity["user_id"],
+                activity_type=activity["activity_type"],
+                details=activity["details"],
+                timestamp=activity["timestamp"],
+            )
+            for activity in activities
+        ]
+        with transaction.atomic():
+            UserActivity.objects.bulk_create(instances, batch_size=self.flush_size)
+            for listener in self._flush_listeners:
+                listener(instances)
+
+    def write_batch(self, activities):
+        """
+        Writes a batch, falling back to one row at a time when a bad row fails it.
+
+        Rows that still fail on their own data are logged and dropped. Any
+        other error (database down or timing out) spills the activities not
+        written yet and is raised.
+
+        Returns:
+            int: Number of activities written.
+        """
+        try:
+            self.write(activities)
+            return len(activities)
+        except BAD_ROW_ERRORS:
+            logger.warning("Batch of %s activities failed, writing them one by one", len(activities))
+        except Exception:
+            self.spill(activities)
+            raise
+
+        written = 0
+        for index, activity in enumerate(activities):
+            try:
+                self.write([activity])
+            except BAD_ROW_ERRORS:
+                logger.exception("Dropped an activity that can't be written: %r", activity)
+                continue
+            except Exception:
+                self.spill(activities[index:])
+                raise
+            written += 1
+        return written
+
+    def spill(self, activities):
+        """
+        Appends a batch to a new spill file (temp file + rename, so a replay never sees half a file).
+        """
+        if not self.spill_dir:
+            logger.error("No spill directory, dropped %s activities", len(activities))
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        name = f"activities-{os.getpid()}-{time.time_ns()}"
+        temp_path = os.path.join(self.spill_dir, f"{name}.tmp")
+        with open(temp_path, "w") as spill_file:
+            for activity in activities:
+                spill_file.write(
+                    json.dumps(
+                        dict(activity, timestamp=activity["timestamp"].isoformat()),
+                        separators=(",", ":"),
+                    )
+                    + "\n"
+                )
+        os.replace(temp_path, os.path.join(self.spill_dir, f"{name}.jsonl"))
+
+    def replay_spill(self):
+        """
+        Writes the spilled files back to the database, oldest first.
+
+        A file is claimed by renaming it, so several workers can replay the
+        same directory. When the database fails again, what is left of the
+        file is put back for the next try. Bad rows are dropped, so a file
+        always drains. A file claimed by a process that died mid-replay is
+        claimed again, the chunks it had already written are written twice.
+
+        Returns:
+            int: Number of activities replayed.
+        """
+        if not self.spill_dir:
+            return 0
+        replayed = 0
+        paths = glob.glob(os.path.join(self.spill_dir, "*.jsonl"))
+        paths += filter(is_orphaned_claim, glob.glob(os.path.join(self.spill_dir, "*.jsonl.*.replaying")))
+        for path in sorted(paths):
+            spill_path = path.split(".jsonl")[0] + ".jsonl"
+            claimed_path = f"{spill_path}.{os.getpid()}.replaying"
+            try:
+                os.rename(path, claimed_path)
+            except OSError:
+                continue  # Claimed by another worker
+            with open(claimed_path) as spill_file:
+                activities = [
+                    dict(activity, timestamp=parse_datetime(activity["timestamp"]))
+                    for activity in map(json.loads, filter(str.strip, spill_file))
+                ]
+            try:
+                for start in range(0, len(activities), self.flush_size):
+                    replayed += self.write_batch(activities[start : start + self.flush_size])
+            except Exception:
+                # write_batch spilled the rest of the failed chunk, put back the chunks after it
+                os.remove(claimed_path)
+                remaining = activities[start + self.flush_size :]
+                if remaining:
+                    self.spill(remaining)
+                raise
+            os.remove(claimed_path)
+        return replayed
+
+
+def is_orphaned_claim(path):
+    """
+    Tells whether a `*.jsonl.<pid>.replaying` spill file was claimed by a
+    process that no longer runs.
+    """
+    pid = int(path.rsplit(".", 2)[-2])
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass  # Alive, owned by another user
+    return False
+
+
+def build_activity(user_id, activity_type, details):
+    """
+    Returns a buffered activity stamped with the current time.
+    """
+    return {
+        "user_id": user_id,
+        "activity_type": activity_type,
+        "details": details,
+        "timestamp": timezone.now(),
+    }
+
+
+activity_buffer = ActivityBuffer(
+    max_size=settings.USER_ACTIVITY_BUFFER_SIZE,
+    flush_size=settings.USER_ACTIVITY_FLUSH_SIZE,
+    flush_interval=settings.USER_ACTIVITY_FLUSH_INTERVAL,
+    spill_dir=settings.USER_ACTIVITY_SPILL_DIR,
+)
+# Hourly/daily rollups are updated in the same transaction as every batch
+activity_buffer.add_flush_listener(apply_activities_to_rollups)
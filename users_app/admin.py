@@ -1,7 +1,9 @@
 from django.contrib import admin
-from users_app.models import User,BlockedUser,FriendRequest,UserActivity
+from users_app.models import User,BlockedUser,FriendRequest,UserActivity,UserActivityRollup,Friendship
 # Register your models here.
 admin.site.register(User)
 admin.site.register(FriendRequest)
 admin.site.register(BlockedUser)
-admin.site.register(UserActivity)
\ No newline at end of file
+admin.site.register(UserActivity)
+admin.site.register(Friendship)
+admin.site.register(UserActivityRollup)
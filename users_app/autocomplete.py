@@ -0,0 +1,356 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from users_app.models import User
+
+
+class SortedKeyList:
+    """
+    Sorted list stored as chunks of about `chunk_size` items, so an insert
+    or a delete shifts one chunk instead of the whole list.
+    """
+
+    def __init__(self, items=(), chunk_size=1000):
+        self.chunk_size = chunk_size
+        items = sorted(items)
+        self._chunks = [
+            items[index : index + chunk_size] for index in range(0, len(items), chunk_size)
+        ]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+
+    def add(self, item):
+        if not self._chunks:
+            self._chunks.append([item])
+            self._maxes.append(item)
+            return
+        position = min(bisect_left(self._maxes, item), len(self._maxes) - 1)
+        chunk = self._chunks[position]
+        insort(chunk, item)
+        self._maxes[position] = chunk[-1]
+        if len(chunk) > 2 * self.chunk_size:
+            # Split the chunk in two so the shifts stay short
+            self._chunks[position : position + 1] = [chunk[: self.chunk_size], chunk[self.chunk_size :]]
+            self._maxes[position : position + 1] = [chunk[self.chunk_size - 1], chunk[-1]]
+
+    def discard(self, item):
+        position = bisect_left(self._maxes, item)
+        if position == len(self._maxes):
+            return
+        chunk = self._chunks[position]
+        index = bisect_left(chunk, item)
+        if chunk[index] != item:
+            return
+        del chunk[index]
+        if chunk:
+            self._maxes[position] = chunk[-1]
+        else:
+            del self._chunks[position]
+            del self._maxes[position]
+
+    def iter_from(self, item):
+        """
+        Yields the items greater than or equal to `item`, in order.
+        """
+        position = bisect_left(self._maxes, item)
+        if position == len(self._maxes):
+            return
+        index = bisect_left(self._chunks[position], item)
+        for chunk in self._chunks[position:]:
+            yield from chunk[index:]
+            index = 0
+
+
+class AutocompleteIndex:
+    """
+    In-process prefix index over usernames and emails.
+
+    Keys are kept in a SortedKeyList of (lowercase key, user_id) tuples, so
+    a prefix query is a single bisect followed by a short forward scan.
+
+    The index is:
+        - built lazily on first use, from the disk snapshot when one exists
+          and from the database otherwise;
+        - patched in place by the User post_save/post_delete signals;
+        - caught up with the database every `refresh_interval` seconds by
+          reading the users updated since the last seen `updated_at`, which
+          also picks up writes made by other workers;
+        - reconciled with the ids of the active users after loading a
+          snapshot and every `reconcile_interval` seconds, which drops the
+          users deleted by other workers and those deactivated with
+          `queryset.update()` (neither shows up in the `updated_at` delta);
+        - written to disk at most every `snapshot_interval` seconds so a new
+          worker starts from the snapshot plus a small delta.
+
+    Reconciling and snapshots run in a background thread, never on the
+    request (or sign up transaction) that found them due.
+    """
+
+    def __init__(self, snapshot_path=None, snapshot_interval=300, refresh_interval=30, reconcile_interval=600):
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.refresh_interval = refresh_interval
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._keys = SortedKeyList()  # (key, user_id) tuples
+        self._users = {}  # user_id -> (username, email)
+        self._high_water = None  # Latest User.updated_at applied to the index
+        self._is_loaded = False
+        self._is_dirty = False
+        self._last_refresh = 0
+        self._last_reconcile = 0
+        self._last_snapshot = 0
+        self._threads = {}  # name -> background thread
+
+    @staticmethod
+    def get_keys(username, email):
+        return {key.lower() for key in (username, email) if key}
+
+    def _add(self, user_id, username, email):
+        self._remove(user_id)
+        self._users[user_id] = (username, email)
+        for key in self.get_keys(username, email):
+            self._keys.add((key, user_id))
+
+    def _remove(self, user_id):
+        user = self._users.pop(user_id, None)
+        if user is None:
+            return
+        for key in self.get_keys(*user):
+            self._keys.discard((key, user_id))
+
+    def _start_background(self, name, target):
+        """
+        Runs `target` in a daemon thread, at most one thread per `name` at a time.
+        """
+        with self._lock:
+            thread = self._threads.get(name)
+            if thread is not None and thread.is_alive():
+                return
+            thread = threading.Thread(
+                target=self._run_background, args=(target,), name=f"autocomplete-{name}", daemon=True
+            )
+            self._threads[name] = thread
+        thread.start()
+
+    @staticmethod
+    def _run_background(target):
+        try:
+            target()
+        finally:
+            # Database connections are per thread, don't leave this one open
+            connections.close_all()
+
+    def _apply(self, user_id, username, email, is_active):
+        if is_active:
+            self._add(user_id, username, email)
+        else:
+            self._remove(user_id)
+
+    def update_user(self, user):
+        """
+        Applies a saved user to the index, called from the post_save signal.
+        """
+        with self._lock:
+            if not self._is_loaded:
+                return  # The user is picked up when the index is loaded
+            self._apply(user.user_id, user.username, user.email, user.is_active)
+            self._is_dirty = True
+        self.snapshot_if_due()
+
+    def remove_user(self, user_id):
+        """
+        Drops a deleted user from the index, called from the post_delete signal.
+        """
+        with self._lock:
+            if not self._is_loaded:
+                return
+            self._remove(user_id)
+            self._is_dirty = True
+        self.snapshot_if_due()
+
+    def ensure_loaded(self):
+        with self._lock:
+            if self._is_loaded:
+                return
+            from_snapshot = self.load_snapshot()
+            if not from_snapshot:
+                self.build()
+            self._is_loaded = True
+            self._last_reconcile = time.monotonic()
+        self.refresh(force=True)
+        if from_snapshot:
+            # Deletions since the snapshot aren't in the delta
+            self._start_background("reconcile", self.reconcile)
+
+    def build(self):
+        """
+        Builds the whole index from the database.
+        """
+        with self._lock:
+            keys = []
+            self._users = {}
+            self._high_water = User.objects.aggregate(high_water=Max("updated_at"))[
+                "high_water"
+            ]
+            users = (
+                User.objects.filter(is_active=True)
+                .values_list("user_id", "username", "email")
+                .iterator(chunk_size=5000)
+            )
+            for user_id, username, email in users:
+                self._users[user_id] = (username, email)
+                keys.extend((key, user_id) for key in self.get_keys(username, email))
+            self._keys = SortedKeyList(keys)
+            self._is_dirty = True
+
+    def refresh(self, force=False):
+        """
+        Applies the users updated since the last refresh (the delta).
+        """
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        self._last_refresh = now
+        if now - self._last_reconcile >= self.reconcile_interval:
+            self._last_reconcile = now
+            self._start_background("reconcile", self.reconcile)
+
+        users = User.objects.order_by("updated_at")
+        if self._high_water is not None:
+            users = users.filter(updated_at__gte=self._high_water)
+        users = users.values_list(
+            "user_id", "username", "email", "is_active", "updated_at"
+        )
+        with self._lock:
+            for user_id, username, email, is_active, updated_at in users.iterator(
+                chunk_size=5000
+            ):
+                self._apply(user_id, username, email, is_active)
+                self._high_water = updated_at
+                self._is_dirty = True
+        self.snapshot_if_due()
+
+    def reconcile(self):
+        """
+        Drops the indexed users that are no longer active users in the database.
+
+        Reads only the active user ids, so deletions and deactivations are
+        caught whichever worker made them and however they were written.
+        Users indexed while the ids are read are left alone.
+        """
+        self._last_reconcile = time.monotonic()
+        with self._lock:
+            indexed_ids = set(self._users)
+        active_ids = set(
+            User.objects.filter(is_active=True)
+            .values_list("user_id", flat=True)
+            .iterator(chunk_size=5000)
+        )
+        with self._lock:
+            stale_ids = (indexed_ids - active_ids) & self._users.keys()
+            for user_id in stale_ids:
+                self._remove(user_id)
+            if stale_ids:
+                self._is_dirty = True
+
+    def search(self, prefix, limit=10, exclude_ids=()):
+        """
+        Returns up to `limit` users whose username or email starts with `prefix`,
+        leaving out the users in `exclude_ids` (e.g. the caller's block set).
+
+        Returns:
+            list: [{"user_id": int, "username": str, "email": str}, ...]
+        """
+        prefix = prefix.lower()
+        self.ensure_loaded()
+        self.refresh()
+
+        results = []
+        with self._lock:
+            seen = set()
+            for key, user_id in self._keys.iter_from((prefix,)):
+                if not key.startswith(prefix) or len(results) >= limit:
+                    break
+                if user_id not in seen and user_id not in exclude_ids:
+                    seen.add(user_id)
+                    username, email = self._users[user_id]
+                    results.append(
+                        {"user_id": user_id, "username": username, "email": email}
+                    )
+        return results
+
+    def load_snapshot(self):
+        """
+        Loads the index from the snapshot file, returns False when there is none.
+        """
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path) as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except (OSError, ValueError):
+            return False
+
+        with self._lock:
+            self._users = {
+                user_id: (username, email)
+                for user_id, username, email in snapshot["users"]
+            }
+            self._keys = SortedKeyList(
+                (key, user_id)
+                for user_id, (username, email) in self._users.items()
+                for key in self.get_keys(username, email)
+            )
+            self._high_water = parse_datetime(snapshot["high_water"] or "")
+            self._last_snapshot = time.monotonic()
+            self._is_dirty = False
+        return True
+
+    def snapshot_if_due(self):
+        if (
+            self.snapshot_path
+            and self._is_dirty
+            and time.monotonic() - self._last_snapshot >= self.snapshot_interval
+        ):
+            self._start_background("snapshot", self.save_snapshot)
+
+    def save_snapshot(self):
+        """
+        Writes the index to disk atomically (temp file + rename).
+        """
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            snapshot = {
+                "high_water": self._high_water.isoformat() if self._high_water else None,
+                "users": [
+                    [user_id, username, email]
+                    for user_id, (username, email) in self._users.items()
+                ],
+            }
+            self._last_snapshot = time.monotonic()
+            self._is_dirty = False
+
+        temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w") as snapshot_file:
+                json.dump(snapshot, snapshot_file, separators=(",", ":"))
+            os.replace(temp_path, self.snapshot_path)
+        except OSError:
+            self._is_dirty = True
+
+
+autocomplete_index = AutocompleteIndex(
+    snapshot_path=getattr(settings, "AUTOCOMPLETE_SNAPSHOT_PATH", None),
+    snapshot_interval=getattr(settings, "AUTOCOMPLETE_SNAPSHOT_INTERVAL", 300),
+    refresh_interval=getattr(settings, "AUTOCOMPLETE_REFRESH_INTERVAL", 30),
+    reconcile_interval=getattr(settings, "AUTOCOMPLETE_RECONCILE_INTERVAL", 600),
+)
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from users_app.models import BlockedUser
+from utils.cache_utils import is_shared_cache
+
+
+def get_block_set_cache_key(user_id):
+    return f"block_set_{user_id}"
+
+
+def get_block_set(user_id):
+    """
+    Returns the ids of the users a user blocked or was blocked by.
+
+    The set is built lazily with one query over BlockedUser in both
+    directions and cached for BLOCK_SET_CACHE_TIMEOUT. The BlockedUser
+    signals drop it after every block or unblock. A per-process cache only
+    drops it in the worker that committed the block, so there the set is
+    kept for BLOCK_SET_LOCAL_CACHE_TIMEOUT only.
+
+    Blocks are committed before the set is dropped (on_commit), so with the
+    shared cache a write path can rely on it, see is_blocked.
+
+    Returns:
+        frozenset: User ids, empty when there is no block either way.
+    """
+    cache_key = get_block_set_cache_key(user_id)
+    block_set = cache.get(cache_key)
+    if block_set is None:
+        blocked_pairs = BlockedUser.objects.filter(
+            Q(blocked_by_id=user_id) | Q(blocked_user_id=user_id)
+        ).values_list("blocked_by_id", "blocked_user_id")
+        block_set = frozenset(
+            blocked_user_id if blocked_by_id == user_id else blocked_by_id
+            for blocked_by_id, blocked_user_id in blocked_pairs
+        )
+        timeout = (
+            settings.BLOCK_SET_CACHE_TIMEOUT
+            if is_shared_cache()
+            else settings.BLOCK_SET_LOCAL_CACHE_TIMEOUT
+        )
+        cache.set(cache_key, block_set, timeout=timeout)
+    return block_set
+
+
+def is_blocked(user_id, other_user_id):
+    """
+    Tells whether either user blocked the other, a set lookup on a cache hit.
+    Falls back to is_blocked_in_db when the cache can't be reached.
+    """
+    try:
+        return other_user_id in get_block_set(user_id)
+    except Exception:
+        return is_blocked_in_db(user_id, other_user_id)
+
+
+def is_blocked_in_db(user_id, other_user_id):
+    """
+    Exact check of a block in either direction with one EXISTS query.
+    """
+    return BlockedUser.objects.filter(
+        Q(blocked_by_id=user_id, blocked_user_id=other_user_id)
+        | Q(blocked_by_id=other_user_id, blocked_user_id=user_id)
+    ).exists()
+
+
+def exclude_blocked(queryset, user_id, field="user_id"):
+    """
+    Excludes the rows whose `field` is a user blocked by or blocking `user_id`.
+
+    Args:
+        queryset (QuerySet): e.g. users, or notifications with field="from_user_id".
+        user_id (int): The requesting user.
+        field (str): Column holding the other user's id.
+    """
+    block_set = get_block_set(user_id)
+    if not block_set:
+        return queryset
+    return queryset.exclude(**{f"{field}__in": block_set})
+
+
+def invalidate_block_sets(*user_ids):
+    """
+    Drops the cached block sets, rebuilt on the next read.
+
+    A block is dropped rather than added in place: two concurrent
+    read-modify-writes could lose one of the blocks, and an unblock can't
+    remove the id when the other user also blocked back.
+    """
+    cache.delete_many([get_block_set_cache_key(user_id) for user_id in user_ids])
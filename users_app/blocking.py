@@ -0,0 +1,172 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from notification_app.counters import decrement_unread_counts
+from notification_app.models import Notification, NotificationOutbox
+from users_app.block_cache import invalidate_block_sets
+from users_app.friend_suggestions import invalidate_friend_suggestions
+from users_app.models import BlockedUser, FriendRequest, Friendship
+from utils.cache_utils import bump_cache_version
+
+
+def get_pair_filter(first_field, second_field, user_id, other_user_ids):
+    """
+    Matches the rows between `user_id` and any of `other_user_ids`, in either direction.
+    """
+    return Q(**{first_field: user_id, f"{second_field}__in": other_user_ids}) | Q(
+        **{f"{first_field}__in": other_user_ids, second_field: user_id}
+    )
+
+
+def block_users(user_id, blocked_user_ids):
+    """
+    Blocks users and cleans up everything between them and the blocker.
+
+    Runs in one transaction with a fixed number of statements, whatever the
+    number of users blocked:
+
+    - one bulk INSERT of the BlockedUser rows (existing blocks are kept),
+    - one DELETE of the friend requests between the pairs, whatever their
+      status (FriendRequest is unique per sender and receiver, so a request
+      sent after an unblock needs a new row),
+    - one DELETE of the friendship edges in both directions,
+    - the notifications between the pairs: one SELECT, one bulk UPDATE that
+      removes the blocked actors from coalesced groups, one DELETE of the
+      notifications left without actors and one UPDATE of their
+      recipients' unread counters (see remove_blocked_actors),
+    - one DELETE of the outbox events between the pairs not delivered yet.
+
+    bulk_create and the set-based statements skip the model signals, so the
+    block sets, friends lists and friend suggestions of everyone involved
+    are invalidated here after commit.
+
+    Args:
+        user_id (int): The blocking user.
+        blocked_user_ids (iterable): Users to block, the blocker is ignored.
+
+    Returns:
+        dict: Number of new blocks and of cleaned up rows per kind.
+    """
+    blocked_user_ids = set(blocked_user_ids) - {user_id}
+    if not blocked_user_ids:
+        return {"blocked": 0, "friend_requests": 0, "friendships": 0, "notifications": 0}
+
+    with transaction.atomic():
+        existing_ids = set(
+            BlockedUser.objects.filter(
+                blocked_by_id=user_id, blocked_user_id__in=blocked_user_ids
+            ).values_list("blocked_user_id", flat=True)
+        )
+        BlockedUser.objects.bulk_create(
+            [
+                BlockedUser(blocked_by_id=user_id, blocked_user_id=blocked_user_id)
+                for blocked_user_id in blocked_user_ids - existing_ids
+            ],
+            ignore_conflicts=True,
+        )
+
+        friend_requests, _ = FriendRequest.objects.filter(
+            get_pair_filter("sender_id", "receiver_id", user_id, blocked_user_ids)
+        ).delete()
+
+        friendships, _ = Friendship.objects.filter(
+            get_pair_filter("user_id", "friend_id", user_id, blocked_user_ids)
+        ).delete()
+
+        notification_count = remove_blocked_actors(user_id, blocked_user_ids)
+        NotificationOutbox.objects.filter(
+            get_pair_filter("to_user_id", "from_user_id", user_id, blocked_user_ids)
+        ).delete()
+
+        affected_ids = {user_id} | blocked_user_ids
+        transaction.on_commit(lambda: invalidate_block_caches(affected_ids, friendships > 0))
+
+    return {
+        "blocked": len(blocked_user_ids - existing_ids),
+        "friend_requests": friend_requests,
+        "friendships": friendships,
+        "notifications": notification_count,
+    }
+
+
+def remove_blocked_actors(user_id, blocked_user_ids):
+    """
+    Removes the blocked users from the notifications of the blocker, and
+    the blocker from the notifications of the blocked users.
+
+    Coalesced notifications ("Raj and 41 others ...") keep their other
+    actors: the blocked ids are taken out of `actor_ids`, `actor_count` and
+    `from_user`, and only the notifications left without actors are
+    deleted. Single-actor notifications are matched on `from_user`, groups
+    (actor_count > 1) are read and checked here.
+
+    Returns:
+        int: Number of notifications deleted.
+    """
+    notifications = Notification.objects.filter(
+        get_pair_filter("to_user_id", "from_user_id", user_id, blocked_user_ids)
+        | Q(to_user_id=user_id, actor_count__gt=1)
+        | Q(to_user_id__in=blocked_user_ids, actor_count__gt=1)
+    ).only("notification_id", "to_user_id", "from_user_id", "actor_ids", "actor_count", "read_at")
+
+    now = timezone.now()
+    updated = []
+    deleted = []
+    for notification in notifications:
+        removed_ids = blocked_user_ids if notification.to_user_id == user_id else {user_id}
+        actor_ids = notification.get_actor_ids()
+        remaining_ids = [actor_id for actor_id in actor_ids if actor_id not in removed_ids]
+        if len(remaining_ids) == len(actor_ids):
+            continue
+        if not remaining_ids:
+            deleted.append(notification)
+            continue
+        notification.actor_count = max(
+            len(remaining_ids),
+            notification.actor_count - (len(actor_ids) - len(remaining_ids)),
+        )
+        notification.actor_ids = remaining_ids
+        notification.from_user_id = remaining_ids[0]  # Most recent actor first
+        notification.updated_at = now
+        updated.append(notification)
+
+    Notification.objects.bulk_update(updated, ["from_user", "actor_ids", "actor_count", "updated_at"])
+    deleted_count, _ = Notification.objects.filter(
+        notification_id__in=[notification.notification_id for notification in deleted]
+    ).delete()
+    decrement_unread_counts(
+        Counter(notification.to_user_id for notification in deleted if notification.read_at is None)
+    )
+    return deleted_count
+
+
+def unblock_users(user_id, blocked_user_ids):
+    """
+    Removes blocks made by `user_id` with one DELETE.
+
+    Friendships and requests cleaned up by the block are not restored. The
+    BlockedUser delete signals invalidate the caches.
+
+    Returns:
+        int: Number of blocks removed.
+    """
+    unblocked, _ = BlockedUser.objects.filter(
+        blocked_by_id=user_id, blocked_user_id__in=set(blocked_user_ids)
+    ).delete()
+    return unblocked
+
+
+def invalidate_block_caches(user_ids, friendships_removed):
+    """
+    Drops the cached data that depends on blocks between `user_ids`.
+
+    Removed friendships change the 2-hop neighbourhood of the users'
+    friends too, so their suggestions are only kept when no edge went away.
+    """
+    invalidate_block_sets(*user_ids)
+    for affected_id in user_ids:
+        bump_cache_version("friends_list", affected_id)
+    invalidate_friend_suggestions(*user_ids, include_friends=friendships_removed)
@@ -1,15 +1,231 @@
-from django.contrib.auth import get_user_model
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_backends, get_user_model
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
 
 class EmailBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         UserModel = get_user_model()
         try:
-            user = UserModel.objects.get(email__iexact=username)
+            user = UserModel.objects.filter_by_email(username).get()
         except UserModel.DoesNotExist:
+            # Hash anyway so a missing email takes as long as a wrong password
+            UserModel().set_password(password)
             return None
         else:
             if user.check_password(password):
                 return user
         return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        try:
+            user = await UserModel.objects.filter_by_email(username).aget()
+        except UserModel.DoesNotExist:
+            # Hash anyway so a missing email takes as long as a wrong password
+            await UserModel().aset_password(password)
+            return None
+        else:
+            if await user.acheck_password(password):
+                return user
+        return None
+
+
+async def aauthenticate(request=None, **credentials):
+    """
+    Async counterpart of django.contrib.auth.authenticate.
+
+    Django 5.1's aauthenticate runs the sync authenticate on the shared
+    sync thread, where the password hash would hold up every other
+    sync_to_async call of the worker. This one awaits the `aauthenticate`
+    of the backends that define it (EmailBackend), so the hash runs on the
+    hashing pool while the event loop stays free. Backends without it
+    (ModelBackend) are skipped instead of hashing on the sync thread.
+    """
+    for backend in get_backends():
+        if not hasattr(backend, "aauthenticate"):
+            continue
+        try:
+            user = await backend.aauthenticate(request, **credentials)
+        except PermissionDenied:
+            break
+        if user is None:
+            continue
+        user.backend = f"{type(backend).__module__}.{type(backend).__qualname__}"
+        return user
+
+    await user_login_failed.asend(
+        sender=__name__,
+        credentials={
+            key: "********************" if key == "password" else value
+            for key, value in credentials.items()
+        },
+        request=request,
+    )
+    return None
+
+
+# Claims copied from the user into the tokens, read back by StatelessJWTAuthentication
+TOKEN_USER_CLAIMS = ("email", "username", "is_active", "is_staff", "is_superuser", "token_version")
+
+# Cached version of a user that can't authenticate (inactive or deleted), never matches a token
+REVOKED_TOKEN_VERSION = -1
+
+
+def get_token_version_cache_key(user_id):
+    return f"auth_token_version_{user_id}"
+
+
+def get_user_cache_key(user_id):
+    return f"auth_user_{user_id}"
+
+
+# user_id -> (token_version, expires_at), this process's copy of the cached versions
+_local_token_versions = {}
+LOCAL_TOKEN_VERSIONS_MAX_ENTRIES = 10000
+
+
+def get_token_version(user_id):
+    """
+    Returns the user's current token version, cached for AUTH_TOKEN_VERSION_CACHE_TIMEOUT.
+    Inactive and deleted users get REVOKED_TOKEN_VERSION.
+
+    The shared cache is a table by default, so each process also keeps the
+    version for AUTH_TOKEN_VERSION_LOCAL_TIMEOUT seconds and most requests
+    run without any query.
+    """
+    now = time.monotonic()
+    local = _local_token_versions.get(user_id)
+    if local is not None and local[1] > now:
+        return local[0]
+
+    cache_key = get_token_version_cache_key(user_id)
+    token_version = cache.get(cache_key)
+    if token_version is None:
+        user = (
+            get_user_model()
+            .objects.filter(pk=user_id)
+            .values_list("token_version", "is_active")
+            .first()
+        )
+        token_version = user[0] if user and user[1] else REVOKED_TOKEN_VERSION
+        cache.set(cache_key, token_version, timeout=settings.AUTH_TOKEN_VERSION_CACHE_TIMEOUT)
+    if len(_local_token_versions) >= LOCAL_TOKEN_VERSIONS_MAX_ENTRIES:
+        _local_token_versions.clear()
+    _local_token_versions[user_id] = (token_version, now + settings.AUTH_TOKEN_VERSION_LOCAL_TIMEOUT)
+    return token_version
+
+
+def get_cached_user(user_id):
+    """
+    Returns the full user model, cached for AUTH_USER_CACHE_TIMEOUT, None when it doesn't exist.
+    """
+    cache_key = get_user_cache_key(user_id)
+    user = cache.get(cache_key)
+    if user is None:
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(cache_key, user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drops the cached token version and user, called when the user is saved.
+    """
+    _local_token_versions.pop(user_id, None)
+    cache.delete_many([get_token_version_cache_key(user_id), get_user_cache_key(user_id)])
+
+
+def get_auth_token(user):
+    """
+    Returns the user's DRF auth token, created on first use.
+    """
+    return Token.objects.get_or_create(user=user)[0]
+
+
+class StatelessRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's claims (TOKEN_USER_CLAIMS).
+    Access tokens made from it copy the claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in TOKEN_USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds `request.user` from the token claims
+    instead of loading the user from the database on every request.
+
+    The user is a User instance made from the claims (user_id, email,
+    username, is_active, is_staff, is_superuser), the other fields are
+    deferred and load on first access, so views that only use the id or
+    filter by the user run without a user query.
+
+    Revocation: the token's `token_version` must equal the user's current
+    version, read from the cache (one small query per user every
+    AUTH_TOKEN_VERSION_CACHE_TIMEOUT seconds) and kept in each process for
+    AUTH_TOKEN_VERSION_LOCAL_TIMEOUT seconds. Deactivating the user,
+    changing the password or User.revoke_tokens() bump the version and
+    drop the cached values, so those tokens stop working in the saving
+    process right away and in the others within the local timeout.
+
+    Tokens issued without the claims are served by a short-TTL cached
+    user lookup instead.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if validated_token.get("is_active") is False:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        try:
+            token_version = get_token_version(user_id)
+        except Exception:
+            # The cache is unavailable, fall back to loading the user
+            return super().get_user(validated_token)
+
+        if token_version == REVOKED_TOKEN_VERSION:
+            raise AuthenticationFailed(_("User not found or inactive"), code="user_inactive")
+        if validated_token.get("token_version", 0) != token_version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        if not all(claim in validated_token for claim in TOKEN_USER_CLAIMS):
+            user = get_cached_user(user_id)
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            return user
+
+        claims = {claim: validated_token[claim] for claim in TOKEN_USER_CLAIMS}
+        claims[api_settings.USER_ID_FIELD] = user_id
+        # from_db() takes the values in field order, missing fields are deferred
+        fields = [
+            field.attname
+            for field in self.user_model._meta.concrete_fields
+            if field.attname in claims
+        ]
+        return self.user_model.from_db(
+            router.db_for_read(self.user_model), fields, [claims[field] for field in fields]
+        )
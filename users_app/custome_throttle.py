@@ -1,9 +1,41 @@
 from rest_framework.throttling import UserRateThrottle
 from rest_framework.exceptions import Throttled
 
+from users_app.rate_limiter import RateLimiter, RateLimiterUnavailable
+
 class LoginThrottle(UserRateThrottle):
+    """
+    Login throttle backed by the cache sliding-window RateLimiter, the rate
+    comes from DEFAULT_THROTTLE_RATES["login"].
+    """
     scope = 'login'
 
+    def get_cache_key(self, request, view):
+        # Login attempts are anonymous, they are limited per client address
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        try:
+            result = RateLimiter(self.scope, rate=self.rate).hit(self.key)
+        except RateLimiterUnavailable:
+            # Don't lock everybody out of login when the cache is down
+            return True
+
+        self.wait_seconds = result.wait
+        if result.allowed:
+            return True
+        return self.throttle_failure()
+
+    def wait(self):
+        return self.wait_seconds
+
     def throttle_failure(self):
         wait = int(self.wait())  # Convert to integer
         
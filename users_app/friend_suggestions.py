@@ -0,0 +1,131 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from users_app.block_cache import get_block_set
+from users_app.models import FriendRequest, Friendship
+from utils.cache_utils import get_or_rebuild
+
+
+def get_suggestions_cache_key(user_id):
+    return f"friend_suggestions_{user_id}"
+
+
+def compute_friend_suggestions(user_id, limit=None):
+    """
+    Ranks friend-of-friend candidates of a user by mutual-friend count.
+
+    All 2-hop edges are counted in one grouped query over Friendship: a
+    candidate's mutual-friend count is the number of the user's friends
+    that have the candidate as a friend. Existing friends, users with a
+    pending request in either direction and blocked pairs in either
+    direction are excluded up front.
+
+    Args:
+        user_id (int): The user to compute suggestions for.
+        limit (int, optional): Number of suggestions kept, FRIEND_SUGGESTIONS_LIMIT by default.
+
+    Returns:
+        list: [[candidate_id, mutual_friends_count], ...] best first.
+    """
+    limit = limit or settings.FRIEND_SUGGESTIONS_LIMIT
+    friend_ids = Friendship.objects.filter(user_id=user_id).values("friend_id")
+
+    pending_ids = FriendRequest.objects.filter(
+        Q(sender_id=user_id) | Q(receiver_id=user_id), status="pending"
+    ).values_list("sender_id", "receiver_id")
+    excluded_ids = {user_id} | get_block_set(user_id)
+    for pair in pending_ids:
+        excluded_ids.update(pair)
+
+    suggestions = (
+        Friendship.objects.filter(user_id__in=friend_ids)
+        .exclude(friend_id__in=friend_ids)
+        .exclude(friend_id__in=excluded_ids)
+        .values("friend_id")
+        .annotate(mutual_friends_count=Count("user_id"))
+        .order_by("-mutual_friends_count", "friend_id")
+        .values_list("friend_id", "mutual_friends_count")[:limit]
+    )
+    return [list(suggestion) for suggestion in suggestions]
+
+
+def get_mutual_friend_counts(user_id, user_ids):
+    """
+    Returns the mutual-friend count between a user and each of `user_ids`.
+
+    One grouped query: for every user in `user_ids`, count their friendship
+    edges that point at one of `user_id`'s friends.
+
+    Args:
+        user_id (int): The requesting user.
+        user_ids (iterable): Users to count mutual friends with, e.g. one page.
+
+    Returns:
+        dict: {user_id: mutual_friends_count}, users without mutual friends are omitted.
+    """
+    friend_ids = Friendship.objects.filter(user_id=user_id).values("friend_id")
+    mutual_friend_counts = (
+        Friendship.objects.filter(user_id__in=list(user_ids), friend_id__in=friend_ids)
+        .values("user_id")
+        .annotate(mutual_friends_count=Count("friend_id"))
+        .values_list("user_id", "mutual_friends_count")
+    )
+    return dict(mutual_friend_counts)
+
+
+def get_friend_suggestions(user_id):
+    """
+    Returns the cached top-N suggestions of a user, computing them on a miss.
+    """
+    return get_or_rebuild(
+        get_suggestions_cache_key(user_id),
+        lambda: compute_friend_suggestions(user_id),
+        settings.FRIEND_SUGGESTIONS_CACHE_TIMEOUT,
+        name="friend_suggestions",
+    )
+
+
+def invalidate_friend_suggestions(*user_ids, include_friends=True):
+    """
+    Drops the cached suggestions of users whose 2-hop neighbourhood changed.
+
+    A new friendship between A and B changes the candidates of A, B and
+    every friend of A or B, so by default all of them are invalidated.
+    Pass `include_friends=False` when only the users themselves are affected.
+    """
+    affected_ids = set(user_ids)
+    if include_friends:
+        affected_ids.update(
+            Friendship.objects.filter(user_id__in=user_ids).values_list(
+                "friend_id", flat=True
+            )
+        )
+    cache.delete_many([get_suggestions_cache_key(user_id) for user_id in affected_ids])
+
+
+def discard_friend_suggestion(user_id, other_user_id):
+    """
+    Removes a pair from each other's cached suggestions without recomputing.
+    Used when a request is sent or a block is added between two users.
+    """
+    for owner_id, candidate_id in ((user_id, other_user_id), (other_user_id, user_id)):
+        cache_key = get_suggestions_cache_key(owner_id)
+        entry = cache.get(cache_key)
+        if entry is None:
+            continue
+        suggestions = entry["value"]
+        remaining = [
+            suggestion for suggestion in suggestions if suggestion[0] != candidate_id
+        ]
+        if len(remaining) != len(suggestions):
+            # Keep the entry's own expiry, only the value changes
+            entry["value"] = remaining
+            cache.set(
+                cache_key,
+                entry,
+                timeout=max(1, int(entry["expires_at"] - time.time()))
+                + settings.CACHE_STALE_TIMEOUT,
+            )
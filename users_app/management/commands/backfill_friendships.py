@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users_app.models import FriendRequest, Friendship
+
+
+class Command(BaseCommand):
+    """
+    Backfill the symmetric Friendship table from accepted FriendRequest rows.
+
+    Usage:
+        python manage.py backfill_friendships
+        python manage.py backfill_friendships --batch-size 5000
+    """
+
+    help = "Backfill Friendship edges from accepted friend requests in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of accepted friend requests processed per batch.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        total = 0
+
+        while True:
+            # Walk accepted requests by primary key so every batch is an index range scan
+            batch = list(
+                FriendRequest.objects.filter(
+                    status="accepted", friend_request_id__gt=last_id
+                )
+                .order_by("friend_request_id")
+                .values_list("friend_request_id", "sender_id", "receiver_id")[
+                    :batch_size
+                ]
+            )
+            if not batch:
+                break
+
+            edges = []
+            for _, sender_id, receiver_id in batch:
+                edges.append(Friendship(user_id=sender_id, friend_id=receiver_id))
+                edges.append(Friendship(user_id=receiver_id, friend_id=sender_id))
+
+            with transaction.atomic():
+                Friendship.objects.bulk_create(edges, ignore_conflicts=True)
+
+            last_id = batch[-1][0]
+            total += len(batch)
+            self.stdout.write(f"Processed {total} accepted friend requests.")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Friendship backfill complete ({total} requests).")
+        )
@@ -0,0 +1,239 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Lower
+from rest_framework.authtoken.models import Token
+
+from users_app.models import User
+from users_app.search_index import index_users
+
+
+def read_rows(input_file, input_format):
+    """
+    Yields (line_number, row) from a CSV file with a header or a JSON-lines file,
+    row is None for a JSON line that is not an object.
+    """
+    if input_format == "csv":
+        for line_number, row in enumerate(csv.DictReader(input_file), start=2):
+            yield line_number, row
+        return
+    for line_number, line in enumerate(input_file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # Malformed lines are passed on as None and counted as invalid
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def get_row_error(row):
+    """
+    Returns why a row can't be imported, None when it is valid.
+    """
+    if row is None:
+        return "not a JSON object"
+    email = row.get("email")
+    if not isinstance(email, str) or "@" not in email:
+        return "invalid email"
+    for field in ("username", "password", "password_hash"):
+        if row.get(field) is not None and not isinstance(row[field], str):
+            return f"invalid {field}"
+    return None
+
+
+def get_batches(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    """
+    Import users from a CSV (with a header) or JSON-lines file.
+
+    Rows have `email` and optionally `username` and `password` (raw, hashed
+    on a process pool) or `password_hash` (already hashed, stored as is).
+    Rows without a password get an unusable one.
+
+    Users are inserted with bulk_create in batches, without per-row
+    signals. Emails and usernames that already exist (case-insensitive for
+    emails) or repeat in the file are skipped. After each batch the search
+    postings of the new users are written in bulk, and with --create-tokens
+    their DRF auth tokens too.
+
+    Usage:
+        python manage.py import_users users.csv
+        python manage.py import_users users.jsonl --batch-size 5000 --workers 8
+        cat users.jsonl | python manage.py import_users - --format jsonl
+    """
+
+    help = "Bulk import users from CSV/JSONL, hashing passwords in a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file, '-' for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            help="Input format, guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows hashed and inserted per batch.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of processes hashing passwords.",
+        )
+        parser.add_argument(
+            "--create-tokens",
+            action="store_true",
+            default=settings.CREATE_AUTH_TOKEN_ON_SIGNUP,
+            help="Create DRF auth tokens for the imported users.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"]
+        if input_format is None:
+            if path.endswith(".csv"):
+                input_format = "csv"
+            elif path.endswith((".jsonl", ".ndjson")):
+                input_format = "jsonl"
+            else:
+                raise CommandError("Pass --format, it can't be guessed from the path.")
+
+        self.seen_emails = set()
+        self.seen_usernames = set()
+        self.totals = {"rows": 0, "created": 0, "skipped": 0, "invalid": 0}
+        started_at = time.monotonic()
+
+        input_file = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            # Workers set Django up themselves when they are spawned instead of forked
+            with ProcessPoolExecutor(
+                max_workers=options["workers"], initializer=django.setup
+            ) as pool:
+                for batch in get_batches(read_rows(input_file, input_format), options["batch_size"]):
+                    self.import_batch(batch, pool, options)
+                    elapsed = time.monotonic() - started_at
+                    self.stdout.write(
+                        f"Processed {self.totals['rows']} rows, created {self.totals['created']} users "
+                        f"({self.totals['rows'] / elapsed:.0f} rows/sec)."
+                    )
+        except (UnicodeDecodeError, csv.Error) as error:
+            raise CommandError(
+                f"Could not read {path}: {error}. Users of the batches processed so far were imported."
+            )
+        finally:
+            if input_file is not sys.stdin:
+                input_file.close()
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.totals['created']} users from {self.totals['rows']} rows in {elapsed:.1f}s "
+                f"({self.totals['rows'] / max(elapsed, 1e-9):.0f} rows/sec), "
+                f"skipped {self.totals['skipped']} existing or repeated, {self.totals['invalid']} invalid."
+            )
+        )
+
+    def import_batch(self, batch, pool, options):
+        self.totals["rows"] += len(batch)
+        rows = []
+        for line_number, row in batch:
+            error = get_row_error(row)
+            if error:
+                self.stderr.write(f"Line {line_number}: {error}, skipped.")
+                self.totals["invalid"] += 1
+                continue
+            email = User.objects.normalize_email(row["email"].strip())
+            username = (row.get("username") or "").strip() or None
+            if email.lower() in self.seen_emails or (username and username in self.seen_usernames):
+                self.totals["skipped"] += 1
+                continue
+            self.seen_emails.add(email.lower())
+            if username:
+                self.seen_usernames.add(username)
+            rows.append((email, username, row.get("password") or None, row.get("password_hash") or None))
+
+        # Skip the users that already exist with one query per column
+        existing_emails = set(
+            User.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=[email.lower() for email, *_ in rows])
+            .values_list("email_lower", flat=True)
+        )
+        existing_usernames = set(
+            User.objects.filter(username__in=[username for _, username, *_ in rows if username])
+            .values_list("username", flat=True)
+        )
+        new_rows = [
+            row for row in rows
+            if row[0].lower() not in existing_emails and row[1] not in existing_usernames
+        ]
+        self.totals["skipped"] += len(rows) - len(new_rows)
+        rows = new_rows
+
+        # Hash the raw passwords on the process pool, in the order of the rows
+        raw_passwords = [password for _, _, password, password_hash in rows if password and not password_hash]
+        chunksize = max(1, len(raw_passwords) // (options["workers"] * 4))
+        hashes = iter(pool.map(make_password, raw_passwords, chunksize=chunksize))
+
+        users = []
+        for email, username, password, password_hash in rows:
+            if password_hash:
+                encoded = password_hash
+            elif password:
+                encoded = next(hashes)
+            else:
+                encoded = make_password(None)
+            users.append(User(email=email, username=username, password=encoded))
+
+        with transaction.atomic():
+            # Rows inserted concurrently by sign ups are ignored as conflicts
+            created_users = self.insert_users(users)
+            index_users(created_users)
+            if options["create_tokens"]:
+                Token.objects.bulk_create(
+                    [Token(user_id=user.user_id, key=Token.generate_key()) for user in created_users],
+                    ignore_conflicts=True,
+                )
+        self.totals["created"] += len(created_users)
+        self.totals["skipped"] += len(users) - len(created_users)
+
+    @staticmethod
+    def insert_users(users):
+        """
+        Inserts the users, skipping conflicts, and returns the ones this import created.
+
+        bulk_create doesn't return ids with ignore_conflicts, so the users
+        are read back by email. A user created meanwhile by a sign up has
+        the same email but not the password hash of the imported row (every
+        hash has its own salt), so it is left out.
+        """
+        passwords = {user.email.lower(): user.password for user in users}
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        candidates = (
+            User.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=passwords.keys())
+            .only("user_id", "email", "username", "password")
+        )
+        return [user for user in candidates if passwords[user.email_lower] == user.password]
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils.dateparse import parse_date
+
+from users_app.models import UserActivity
+from users_app.rollups import rebuild_rollups_for_day
+
+
+class Command(BaseCommand):
+    """
+    Recompute the hourly and daily activity rollups from UserActivity.
+
+    Every day is rebuilt in its own transaction (delete + re-aggregate), so
+    the command is safe to run again over the same range.
+
+    Usage:
+        python manage.py rebuild_activity_rollups
+        python manage.py rebuild_activity_rollups --since 2024-09-01 --until 2024-09-30
+    """
+
+    help = "Rebuild activity rollups day by day, idempotent."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="First UTC day to rebuild (YYYY-MM-DD), the oldest activity by default.",
+        )
+        parser.add_argument(
+            "--until",
+            help="Last UTC day to rebuild (YYYY-MM-DD), the newest activity by default.",
+        )
+
+    def handle(self, *args, **options):
+        bounds = UserActivity.objects.aggregate(oldest=Min("timestamp"), newest=Max("timestamp"))
+        if bounds["oldest"] is None and not (options["since"] and options["until"]):
+            self.stdout.write(self.style.SUCCESS("No activities to roll up."))
+            return
+
+        since = self.get_day(options["since"], bounds["oldest"])
+        until = self.get_day(options["until"], bounds["newest"])
+        if since > until:
+            raise CommandError("--since must not be after --until.")
+
+        day = since
+        total = 0
+        while day <= until:
+            total += rebuild_rollups_for_day(day)
+            self.stdout.write(f"Rebuilt rollups of {day:%Y-%m-%d}.")
+            day += timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} rollup rows."))
+
+    def get_day(self, value, default):
+        if value is None:
+            return default.date()
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date: {value}")
+        return day
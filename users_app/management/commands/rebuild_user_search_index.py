@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from users_app.models import User
+from users_app.search_index import index_users
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the trigram search index of users in batches.
+
+    Usage:
+        python manage.py rebuild_user_search_index
+        python manage.py rebuild_user_search_index --batch-size 2000
+    """
+
+    help = "Rebuild the trigram search index for every user."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of users indexed per batch.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        total = 0
+
+        while True:
+            users = list(
+                User.objects.filter(user_id__gt=last_id)
+                .order_by("user_id")
+                .only("user_id", "email", "username")[:batch_size]
+            )
+            if not users:
+                break
+
+            index_users(users)
+
+            last_id = users[-1].user_id
+            total += len(users)
+            self.stdout.write(f"Indexed {total} users.")
+
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt ({total} users)."))
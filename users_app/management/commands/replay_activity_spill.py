@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from users_app.activity_buffer import activity_buffer
+
+
+class Command(BaseCommand):
+    """
+    Write user activities spilled to disk by the activity buffer back to the database.
+
+    Usage:
+        python manage.py replay_activity_spill
+    """
+
+    help = "Replay user activities spilled to USER_ACTIVITY_SPILL_DIR."
+
+    def handle(self, *args, **options):
+        replayed = activity_buffer.replay_spill()
+        self.stdout.write(self.style.SUCCESS(f"Replayed {replayed} activities."))
@@ -1,10 +1,17 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db.models.functions import Lower
 
 
 class UserManager(BaseUserManager):
     # Flag to indicate usage in migrations
     use_in_migrations = True
 
+    def filter_by_email(self, email):
+        """
+        Case-insensitive email lookup served by the user_email_lower_unique index.
+        """
+        return self.annotate(email_lower=Lower('email')).filter(email_lower=(email or '').lower())
+
     # Method to create a user
     def create_user(self, email, password=None, **extra_fields):
         # Check if email is provided
@@ -18,6 +25,19 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)  # Save user in the database
         return user
 
+    async def acreate_user(self, email, password=None, **extra_fields):
+        """
+        Async create_user, the password is hashed without blocking the event loop.
+        """
+        if not email:
+            raise ValueError('Email is required.')
+
+        email = self.normalize_email(email)
+        user = self.model(email=email, **extra_fields)
+        await user.aset_password(password)
+        await user.asave(using=self._db)
+        return user
+
     def create_superuser(self, email, password, **extra_fields):
         """
         Create and save a SuperUser with the given email and password.
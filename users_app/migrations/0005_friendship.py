@@ -0,0 +1,71 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Accepted friend requests copied per batch
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_friendships(apps, schema_editor):
+    """
+    Stores the accepted friend requests as Friendship edges, so existing
+    friends lists aren't empty after deploy. Same as the
+    backfill_friendships command, which can be re-run at any time.
+    """
+    FriendRequest = apps.get_model("users_app", "FriendRequest")
+    Friendship = apps.get_model("users_app", "Friendship")
+    last_id = 0
+    while True:
+        batch = list(
+            FriendRequest.objects.filter(status="accepted", friend_request_id__gt=last_id)
+            .order_by("friend_request_id")
+            .values_list("friend_request_id", "sender_id", "receiver_id")[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        edges = []
+        for _, sender_id, receiver_id in batch:
+            edges.append(Friendship(user_id=sender_id, friend_id=receiver_id))
+            edges.append(Friendship(user_id=receiver_id, friend_id=sender_id))
+        Friendship.objects.bulk_create(edges, ignore_conflicts=True)
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users_app", "0004_useractivity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Friendship",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("friendship_id", models.AutoField(primary_key=True, serialize=False)),
+                (
+                    "friend",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="friendship_friend_model_manager",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="friendship_user_model_manager",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("user", "friend")},
+            },
+        ),
+        migrations.RunPython(backfill_friendships, migrations.RunPython.noop),
+    ]
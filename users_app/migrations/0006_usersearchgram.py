@@ -0,0 +1,77 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of users_app.search_index at the time of this migration
+SEARCH_GRAM_SIZE = 3
+BACKFILL_BATCH_SIZE = 1000
+
+
+def get_grams(text):
+    text = (text or "").lower()
+    return {
+        text[index : index + SEARCH_GRAM_SIZE]
+        for index in range(len(text) - SEARCH_GRAM_SIZE + 1)
+    }
+
+
+def index_existing_users(apps, schema_editor):
+    """
+    Indexes the existing users, so search finds them right after deploy.
+    Same as the rebuild_user_search_index command.
+    """
+    User = apps.get_model("users_app", "User")
+    UserSearchGram = apps.get_model("users_app", "UserSearchGram")
+    last_id = 0
+    while True:
+        users = list(
+            User.objects.filter(user_id__gt=last_id)
+            .order_by("user_id")
+            .values_list("user_id", "email", "username")[:BACKFILL_BATCH_SIZE]
+        )
+        if not users:
+            break
+        UserSearchGram.objects.bulk_create(
+            [
+                UserSearchGram(gram=gram, user_id=user_id)
+                for user_id, email, username in users
+                for gram in get_grams(email) | get_grams(username)
+            ],
+            batch_size=BACKFILL_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        last_id = users[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users_app", "0005_friendship"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserSearchGram",
+            fields=[
+                (
+                    "user_search_gram_id",
+                    models.BigAutoField(primary_key=True, serialize=False),
+                ),
+                ("gram", models.CharField(max_length=3)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="user_search_gram_user_model_manager",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("gram", "user")},
+            },
+        ),
+        migrations.RunPython(index_existing_users, migrations.RunPython.noop),
+    ]
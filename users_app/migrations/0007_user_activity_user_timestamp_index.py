@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users_app", "0006_usersearchgram"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="useractivity",
+            index=models.Index(
+                fields=["user", "-timestamp", "-user_activity_id"],
+                name="user_activity_user_timestamp",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users_app", "0007_user_activity_user_timestamp_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserActivityRollup",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user_activity_rollup_id",
+                    models.BigAutoField(primary_key=True, serialize=False),
+                ),
+                (
+                    "activity_type",
+                    models.CharField(
+                        choices=[
+                            ("friend_request_sent", "friend_request_sent"),
+                            ("friend_request_accepted", "friend_request_accepted"),
+                            ("friend_request_rejected", "friend_request_rejected"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("hour", "hour"), ("day", "day")], max_length=10
+                    ),
+                ),
+                ("period_start", models.DateTimeField()),
+                ("activity_count", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="user_activity_rollup_user_model_manager",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {
+                    ("user", "granularity", "period_start", "activity_type")
+                },
+            },
+        ),
+    ]
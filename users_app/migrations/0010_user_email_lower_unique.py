@@ -0,0 +1,56 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:07
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+# Duplicate emails listed in the error
+REPORTED_DUPLICATES = 20
+
+
+def check_case_duplicate_emails(apps, schema_editor):
+    """
+    Stops the migration with the list of emails that differ only in case,
+    the constraint can't be added while they exist. Which account keeps the
+    email is for an admin to decide, merge or rename them and migrate again.
+    """
+    User = apps.get_model("users_app", "User")
+    duplicates = list(
+        User.objects.annotate(email_lower=Lower("email"))
+        .values("email_lower")
+        .annotate(accounts=Count("pk"))
+        .filter(accounts__gt=1)
+        .order_by("email_lower")
+        .values_list("email_lower", "accounts")
+    )
+    if not duplicates:
+        return
+    listed = ", ".join(
+        f"{email} ({accounts} accounts)" for email, accounts in duplicates[:REPORTED_DUPLICATES]
+    )
+    if len(duplicates) > REPORTED_DUPLICATES:
+        listed += f" and {len(duplicates) - REPORTED_DUPLICATES} more"
+    raise RuntimeError(
+        f"{len(duplicates)} emails are used by several users with different case: "
+        f"{listed}. Resolve them before adding the user_email_lower_unique constraint."
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users_app", "0009_user_token_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="user_email_lower_unique",
+            ),
+        ),
+    ]
@@ -2,8 +2,16 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from users_app.mixin import BaseModleMixin
 from users_app.manager import UserManager
+from users_app.password_hashing import (
+    ahash_password,
+    acheck_password_hash,
+    check_password_hash,
+    hash_password,
+)
+from users_app.rate_limiter import RateLimiter, RateLimiterUnavailable, in_cooldown, start_cooldown
 
 from django.contrib.auth.models import User
+from django.db.models.functions import Lower
 from django.utils import timezone
 from datetime import timedelta
 
@@ -13,6 +21,8 @@ class User(AbstractUser, BaseModleMixin):
     user_id = models.AutoField(primary_key=True, null=False, blank=False)
     username = models.CharField(max_length=150, null=True, blank=True, unique=True,db_index=True)
     email = models.EmailField(unique=True,db_index=True)
+    # Copied into access tokens, bumping it revokes every token issued before
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
@@ -23,6 +33,53 @@ class User(AbstractUser, BaseModleMixin):
     def __str__(self) -> str:
         return f"ID : {self.user_id} -> {self.email}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # Values as loaded, the revoke_user_tokens signal compares the claims with them
+        user._loaded_values = dict(zip(field_names, values))
+        return user
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Emails are unique regardless of case, sign up relies on it
+            # instead of checking first, and email lookups use the index
+            models.UniqueConstraint(Lower('email'), name='user_email_lower_unique'),
+        ]
+
+    def set_password(self, raw_password):
+        # Hashed on the bounded hashing pool, see users_app.password_hashing
+        self.password = hash_password(raw_password)
+        self._password = raw_password
+
+    async def aset_password(self, raw_password):
+        self.password = await ahash_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        is_correct, must_update = check_password_hash(raw_password, self.password)
+        if is_correct and must_update:
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password changes.
+            self._password = None
+            self.save(update_fields=["password"])
+        return is_correct
+
+    async def acheck_password(self, raw_password):
+        is_correct, must_update = await acheck_password_hash(raw_password, self.password)
+        if is_correct and must_update:
+            await self.aset_password(raw_password)
+            self._password = None
+            await self.asave(update_fields=["password"])
+        return is_correct
+
+    def revoke_tokens(self):
+        """
+        Invalidates every token issued to the user so far.
+        """
+        self.token_version += 1
+        self.save(update_fields=['token_version', 'updated_at'])
+
 class FriendRequest(BaseModleMixin):
     """
     Model for managing friend requests between users.
@@ -46,6 +103,49 @@ class FriendRequest(BaseModleMixin):
 
     @staticmethod
     def can_send_request(sender, receiver, cooldown_hours=24):
+        """
+        Checks the rejection cooldown, then counts the send against the
+        sender's rate limits in the cache. Falls back to the database
+        queries when the cache is unavailable.
+
+        The send is counted as soon as it is allowed, call
+        `undo_send_request` when the request isn't created after all.
+        """
+        if FriendRequest.in_rejection_cooldown(sender, receiver, cooldown_hours):
+            return False
+        pair = f"{sender.user_id}:{receiver.user_id}"
+        try:
+            if not RateLimiter('friend_request_send').hit(sender.user_id).allowed:
+                return False
+            if not RateLimiter('friend_request_pair').hit(pair).allowed:
+                RateLimiter('friend_request_send').undo(sender.user_id)
+                return False
+            return True
+        except RateLimiterUnavailable:
+            return FriendRequest.can_send_request_from_db(sender, receiver, cooldown_hours)
+
+    @staticmethod
+    def undo_send_request(sender, receiver):
+        RateLimiter('friend_request_send').undo(sender.user_id)
+        RateLimiter('friend_request_pair').undo(f"{sender.user_id}:{receiver.user_id}")
+
+    @staticmethod
+    def in_rejection_cooldown(sender, receiver, cooldown_hours=24):
+        """
+        Tells whether the receiver rejected the sender in the last `cooldown_hours`.
+
+        Reads the cache marker set on rejection, the database is only
+        queried when the cache is unavailable.
+        """
+        try:
+            return in_cooldown('friend_request_rejected', f"{sender.user_id}:{receiver.user_id}")
+        except RateLimiterUnavailable:
+            pass
+        rejection_cooldown = timezone.now() - timedelta(hours=cooldown_hours)
+        return FriendRequest.objects.filter(sender=sender, receiver=receiver, status='rejected', updated_at__gte=rejection_cooldown).exists()
+
+    @staticmethod
+    def can_send_request_from_db(sender, receiver, cooldown_hours=24):
         # Check rate limiting (3 requests per minute)
         one_min_ago = timezone.now() - timedelta(minutes=1)
         sent_count = FriendRequest.objects.filter(sender=sender, created_at__gte=one_min_ago).count()
@@ -56,6 +156,15 @@ class FriendRequest(BaseModleMixin):
         rejection_cooldown = timezone.now() - timedelta(hours=cooldown_hours)
         rejected_recently = FriendRequest.objects.filter(sender=sender, receiver=receiver, status='rejected', updated_at__gte=rejection_cooldown).exists()
         return not rejected_recently
+
+    @staticmethod
+    def start_rejection_cooldown(sender_id, receiver_id, cooldown_hours=24):
+        # Without the cache the database fallback still sees the rejected row
+        try:
+            start_cooldown('friend_request_rejected', f"{sender_id}:{receiver_id}", cooldown_hours * 3600)
+        except RateLimiterUnavailable:
+            pass
+
     def __str__(self) -> str:
         return f"ID : {self.friend_request_id} -> Sender :- {self.sender.user_id} recipient :- {self.receiver.user_id} -> Status {self.status}"
     
@@ -63,6 +172,50 @@ class FriendRequest(BaseModleMixin):
         unique_together = ("sender","receiver") 
 
 
+class Friendship(BaseModleMixin):
+    """
+    Denormalized, symmetric friendship edge between two users.
+
+    Every accepted friend request is stored as two rows (user -> friend and
+    friend -> user) so a friends list is a single index range scan on `user`.
+
+    Attributes:
+        friendship_id (int): Unique ID for the friendship edge.
+        user (ForeignKey): The user who owns this edge.
+        friend (ForeignKey): The friend of `user`.
+    """
+    friendship_id = models.AutoField(primary_key=True, null=False, blank=False)
+    user = models.ForeignKey(User,on_delete=models.CASCADE,related_name='friendship_user_model_manager')
+    friend = models.ForeignKey(User,on_delete=models.CASCADE,related_name='friendship_friend_model_manager')
+
+    @staticmethod
+    def add_friendship(user_id, friend_id):
+        # Write both directions of the edge, existing edges are left untouched
+        Friendship.objects.bulk_create(
+            [
+                Friendship(user_id=user_id, friend_id=friend_id),
+                Friendship(user_id=friend_id, friend_id=user_id),
+            ],
+            ignore_conflicts=True,
+        )
+
+    @staticmethod
+    def remove_friendship(user_id, friend_id):
+        # Delete both directions of the edge
+        Friendship.objects.filter(
+            models.Q(user_id=user_id, friend_id=friend_id) | models.Q(user_id=friend_id, friend_id=user_id)
+        ).delete()
+
+    def __str__(self):
+        return f"ID : {self.friendship_id} -> User ID : {self.user_id} -> Friend ID : {self.friend_id}"
+
+    class Meta:
+        """
+        Each directed edge is stored only once.
+        """
+        unique_together = ("user","friend")
+
+
 class BlockedUser(BaseModleMixin):
     """
     Represents a block action where one user blocks another.
@@ -107,7 +260,80 @@ class UserActivity(BaseModleMixin):
     timestamp = models.DateTimeField(default=timezone.now)
     details = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Serves the per-user history: keyset pages over (timestamp, pk)
+            # newest first and timestamp-range filters
+            models.Index(fields=['user', '-timestamp', '-user_activity_id'], name='user_activity_user_timestamp'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.activity_type} on {self.timestamp}"
 
 
+class UserSearchGram(models.Model):
+    """
+    Trigram posting used by the user search index.
+
+    Each row says "this user's email or username contains this trigram".
+    Rows are maintained by `users_app.search_index` from User post_save and
+    removed with the user through the cascade. The model skips
+    BaseModleMixin on purpose, the table holds dozens of rows per user and
+    timestamps would only make it larger.
+
+    Attributes:
+        user_search_gram_id (int): Unique ID for the posting.
+        gram (CharField): Lowercase trigram.
+        user (ForeignKey): The user whose email or username contains the trigram.
+    """
+    user_search_gram_id = models.BigAutoField(primary_key=True, null=False, blank=False)
+    gram = models.CharField(max_length=3)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_search_gram_user_model_manager')
+
+    def __str__(self):
+        return f"Gram : {self.gram} -> User ID : {self.user_id}"
+
+    class Meta:
+        """
+        One posting per (gram, user), the unique index doubles as the posting list index.
+        """
+        unique_together = ("gram","user")
+
+
+class UserActivityRollup(BaseModleMixin):
+    """
+    Number of activities of one type a user produced in one hour or one day.
+
+    Rows are kept up to date by `users_app.rollups` whenever the activity
+    buffer writes a batch, and recomputed from UserActivity by the
+    rebuild_activity_rollups command for backfills. Dashboards read these
+    small rows instead of grouping the raw activities.
+
+    Attributes:
+        user_activity_rollup_id (int): Unique ID for the rollup row.
+        user (ForeignKey): The user the activities belong to.
+        activity_type (CharField): The type of the counted activities.
+        granularity (CharField): 'hour' or 'day'.
+        period_start (DateTimeField): Start of the hour or day (UTC).
+        activity_count (PositiveIntegerField): Number of activities in the period.
+    """
+    GRANULARITIES = [
+        ('hour', 'hour'),
+        ('day', 'day'),
+    ]
+    user_activity_rollup_id = models.BigAutoField(primary_key=True, null=False, blank=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_activity_rollup_user_model_manager')
+    activity_type = models.CharField(max_length=50, choices=UserActivity.ACTIVITY_TYPES)
+    granularity = models.CharField(max_length=10, choices=GRANULARITIES)
+    period_start = models.DateTimeField()
+    activity_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"User ID : {self.user_id} -> {self.activity_type} per {self.granularity} from {self.period_start} : {self.activity_count}"
+
+    class Meta:
+        """
+        One row per (user, granularity, period, type), the unique index also
+        serves the dashboard range queries of one user.
+        """
+        unique_together = ("user","granularity","period_start","activity_type")
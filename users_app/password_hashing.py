@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingSaturated(APIException):
+    """
+    Raised when every hashing worker is busy and the queue is full.
+    DRF answers it with 503, so a login spike is rejected fast instead of
+    piling up requests that wait for a hash.
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many login or sign up attempts right now. Please try again shortly."
+    default_code = "password_hashing_saturated"
+
+
+class PasswordHashingExecutor:
+    """
+    Bounded pool that runs the CPU-heavy password hashes (PBKDF2).
+
+    hashlib releases the GIL while it computes PBKDF2, so a thread pool
+    hashes in parallel without the cost of a process pool. At most
+    `max_workers` hashes run at once and `queue_size` more may wait, any
+    further hash raises PasswordHashingSaturated right away.
+
+    Sync callers wait for the result with `run`, which still blocks the
+    request thread (a gunicorn sync worker stays busy for the whole hash),
+    the pool only bounds how many hashes run at once. Async callers await
+    `arun` and leave the event loop free while the hash is computed.
+    """
+
+    def __init__(self, max_workers=4, queue_size=16):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hashing"
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + queue_size)
+
+    def submit(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingSaturated()
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, function, *args):
+        # Blocks the calling thread until the hash is done
+        return self.submit(function, *args).result()
+
+    async def arun(self, function, *args):
+        return await asyncio.wrap_future(self.submit(function, *args))
+
+
+password_hashing_executor = PasswordHashingExecutor(
+    max_workers=settings.PASSWORD_HASHING_WORKERS,
+    queue_size=settings.PASSWORD_HASHING_QUEUE_SIZE,
+)
+
+
+def hash_password(raw_password):
+    """
+    Returns the hash of `raw_password`, computed on the hashing pool.
+
+    Raises:
+        PasswordHashingSaturated: The pool and its queue are full.
+    """
+    if raw_password is None:
+        return make_password(None)  # Unusable password, nothing to hash
+    return password_hashing_executor.run(make_password, raw_password)
+
+
+async def ahash_password(raw_password):
+    if raw_password is None:
+        return make_password(None)
+    return await password_hashing_executor.arun(make_password, raw_password)
+
+
+def check_password_hash(raw_password, encoded):
+    """
+    Verifies `raw_password` against a stored hash on the hashing pool.
+
+    Returns:
+        tuple: (is_correct, must_update), `must_update` tells that the hash
+        uses outdated parameters and should be stored again.
+
+    Raises:
+        PasswordHashingSaturated: The pool and its queue are full.
+    """
+    return password_hashing_executor.run(verify_password, raw_password, encoded)
+
+
+async def acheck_password_hash(raw_password, encoded):
+    return await password_hashing_executor.arun(verify_password, raw_password, encoded)
@@ -0,0 +1,136 @@
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+RateLimitResult = namedtuple("RateLimitResult", ["allowed", "wait"])
+
+
+class RateLimiterUnavailable(Exception):
+    """
+    Raised when the cache backing the rate limiter can't be reached.
+    Callers fall back to their database checks.
+    """
+
+
+def parse_rate(rate):
+    """
+    Parses a rate such as "3/min" or "5/hour" into (num_requests, duration_in_seconds),
+    the same format as DRF's DEFAULT_THROTTLE_RATES.
+    """
+    num_requests, period = rate.split("/")
+    duration = {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+    return int(num_requests), duration
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter stored in the Django cache.
+
+    Hits are counted in fixed windows with atomic `cache.add` + `cache.incr`,
+    and the previous window's count is weighted by how much of it still
+    overlaps the sliding window. That costs two cache round trips per hit
+    and no database query, and smooths out the burst allowed at window
+    boundaries by plain fixed windows.
+
+    Usage:
+        result = RateLimiter("friend_request_send").hit(user.user_id)
+        if not result.allowed:
+            ...  # retry after result.wait seconds
+    """
+
+    key_prefix = "ratelimit"
+
+    def __init__(self, scope, rate=None):
+        self.scope = scope
+        self.rate = rate or settings.RATE_LIMITS[scope]
+        self.num_requests, self.duration = parse_rate(self.rate)
+
+    def get_cache_key(self, ident, window):
+        return f"{self.key_prefix}:{self.scope}:{ident}:{window}"
+
+    def hit(self, ident):
+        """
+        Records a hit for `ident` and tells whether it is within the limit.
+        Rejected hits are not counted, so clients that keep retrying are not
+        locked out for longer.
+
+        Returns:
+            RateLimitResult: (allowed, wait), `wait` is the number of seconds
+            until the next hit would be allowed (0 when allowed).
+
+        Raises:
+            RateLimiterUnavailable: The cache could not be reached.
+        """
+        now = time.time()
+        window = int(now // self.duration)
+        elapsed = (now % self.duration) / self.duration
+        current_key = self.get_cache_key(ident, window)
+
+        try:
+            # Keep the counter for two windows, it is read as "previous" in the next one
+            cache.add(current_key, 0, timeout=self.duration * 2)
+            current_count = cache.incr(current_key)
+            previous_count = cache.get(self.get_cache_key(ident, window - 1), 0)
+        except Exception as error:
+            raise RateLimiterUnavailable(str(error)) from error
+
+        estimated_count = previous_count * (1 - elapsed) + current_count
+        if estimated_count <= self.num_requests:
+            return RateLimitResult(True, 0)
+
+        try:
+            cache.decr(current_key)
+        except Exception:
+            pass
+        return RateLimitResult(False, self.get_wait(previous_count, current_count - 1, elapsed))
+
+    def undo(self, ident):
+        """
+        Takes back an allowed hit of the current window, e.g. when the action
+        it was counted for didn't happen after all. Best effort, a missing
+        counter or an unreachable cache is ignored.
+        """
+        window = int(time.time() // self.duration)
+        try:
+            cache.decr(self.get_cache_key(ident, window))
+        except Exception:
+            pass
+
+    def get_wait(self, previous_count, current_count, elapsed):
+        """
+        Seconds until the weighted count leaves room for one more hit.
+        """
+        remaining = (1 - elapsed) * self.duration
+        if current_count + 1 > self.num_requests or not previous_count:
+            return remaining
+        # previous_count * (1 - x) + current_count + 1 <= num_requests
+        required_elapsed = 1 - (self.num_requests - current_count - 1) / previous_count
+        return min(remaining, max(0, (required_elapsed - elapsed) * self.duration))
+
+
+def start_cooldown(scope, ident, seconds):
+    """
+    Marks `ident` as cooling down for `seconds`.
+
+    Raises:
+        RateLimiterUnavailable: The cache could not be reached.
+    """
+    try:
+        cache.set(f"{RateLimiter.key_prefix}:cooldown:{scope}:{ident}", 1, timeout=seconds)
+    except Exception as error:
+        raise RateLimiterUnavailable(str(error)) from error
+
+
+def in_cooldown(scope, ident):
+    """
+    Tells whether `ident` is still cooling down.
+
+    Raises:
+        RateLimiterUnavailable: The cache could not be reached.
+    """
+    try:
+        return bool(cache.get(f"{RateLimiter.key_prefix}:cooldown:{scope}:{ident}"))
+    except Exception as error:
+        raise RateLimiterUnavailable(str(error)) from error
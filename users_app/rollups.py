@@ -0,0 +1,141 @@
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from users_app.models import UserActivity, UserActivityRollup
+
+# Granularities maintained for every activity
+ROLLUP_GRANULARITIES = ("hour", "day")
+
+
+def get_period_start(timestamp, granularity):
+    """
+    Truncates a timestamp to the start of its hour or day in UTC.
+    """
+    timestamp = timestamp.astimezone(dt_timezone.utc)
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_rollup_counts(activities):
+    """
+    Counts activities per rollup row.
+
+    Returns:
+        Counter: {(user_id, granularity, period_start, activity_type): count}
+    """
+    return Counter(
+        (activity.user_id, granularity, get_period_start(activity.timestamp, granularity), activity.activity_type)
+        for activity in activities
+        for granularity in ROLLUP_GRANULARITIES
+    )
+
+
+def add_rollup_counts(rollup_counts):
+    """
+    Adds counts to the rollup rows, creating the missing rows.
+
+    Existing rows are locked and updated with one bulk UPDATE, missing rows
+    are created with one bulk INSERT. When another writer created one of
+    them in the meantime, the new rows are added one by one instead.
+    """
+    if not rollup_counts:
+        return
+    with transaction.atomic():
+        keys = set(rollup_counts)
+        rollups = UserActivityRollup.objects.select_for_update().filter(
+            user_id__in={key[0] for key in keys},
+            period_start__in={key[2] for key in keys},
+        )
+        existing = {}
+        now = timezone.now()
+        for rollup in rollups:
+            key = (rollup.user_id, rollup.granularity, rollup.period_start, rollup.activity_type)
+            if key in keys:
+                rollup.activity_count += rollup_counts[key]
+                # bulk_update doesn't run auto_now
+                rollup.updated_at = now
+                existing[key] = rollup
+        UserActivityRollup.objects.bulk_update(existing.values(), ["activity_count", "updated_at"])
+
+        missing = {key: count for key, count in rollup_counts.items() if key not in existing}
+        try:
+            with transaction.atomic():
+                UserActivityRollup.objects.bulk_create(
+                    [
+                        UserActivityRollup(
+                            user_id=user_id,
+                            granularity=granularity,
+                            period_start=period_start,
+                            activity_type=activity_type,
+                            activity_count=count,
+                        )
+                        for (user_id, granularity, period_start, activity_type), count in missing.items()
+                    ]
+                )
+        except IntegrityError:
+            for key, count in missing.items():
+                add_rollup_count(key, count)
+
+
+def add_rollup_count(key, count):
+    user_id, granularity, period_start, activity_type = key
+    lookup = dict(
+        user_id=user_id,
+        granularity=granularity,
+        period_start=period_start,
+        activity_type=activity_type,
+    )
+    if UserActivityRollup.objects.filter(**lookup).update(activity_count=F("activity_count") + count):
+        return
+    try:
+        with transaction.atomic():
+            UserActivityRollup.objects.create(activity_count=count, **lookup)
+    except IntegrityError:
+        UserActivityRollup.objects.filter(**lookup).update(activity_count=F("activity_count") + count)
+
+
+def apply_activities_to_rollups(activities):
+    """
+    Activity buffer flush listener, folds a written batch into the rollups.
+    """
+    add_rollup_counts(get_rollup_counts(activities))
+
+
+def rebuild_rollups_for_day(day):
+    """
+    Recomputes the hourly and daily rollups of one UTC day from UserActivity.
+
+    The day's rollup rows are deleted and inserted again from one GROUP BY
+    per granularity in a single transaction, so running it twice gives the
+    same rows (idempotent) and it can be used for backfills.
+
+    Returns:
+        int: Number of rollup rows written.
+    """
+    start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    end = start + timedelta(days=1)
+    rollups = []
+    with transaction.atomic():
+        UserActivityRollup.objects.filter(
+            Q(granularity="hour", period_start__gte=start, period_start__lt=end)
+            | Q(granularity="day", period_start=start)
+        ).delete()
+        for granularity in ROLLUP_GRANULARITIES:
+            counts = (
+                UserActivity.objects.filter(timestamp__gte=start, timestamp__lt=end)
+                .annotate(period_start=Trunc("timestamp", granularity, tzinfo=dt_timezone.utc))
+                .values("user_id", "period_start", "activity_type")
+                .annotate(activity_count=Count("user_activity_id"))
+                .order_by()
+            )
+            rollups += [
+                UserActivityRollup(granularity=granularity, **count) for count in counts
+            ]
+        UserActivityRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
@@ -0,0 +1,131 @@
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from users_app.models import UserSearchGram
+
+# Length of the n-grams stored in the index
+SEARCH_GRAM_SIZE = 3
+
+
+def get_grams(text):
+    """
+    Returns the set of lowercase trigrams contained in `text`.
+
+    Args:
+        text (str): Email, username or search term.
+
+    Returns:
+        set: Trigrams, empty when `text` is shorter than SEARCH_GRAM_SIZE.
+    """
+    text = (text or "").lower()
+    return {
+        text[index : index + SEARCH_GRAM_SIZE]
+        for index in range(len(text) - SEARCH_GRAM_SIZE + 1)
+    }
+
+
+def get_user_grams(user):
+    """
+    Returns the trigrams of the user's email and username.
+    """
+    return get_grams(user.email) | get_grams(user.username)
+
+
+def index_user(user, created=False):
+    """
+    Brings the postings of a single user in line with their email and username.
+
+    Only the trigrams that changed are written, so re-saving a user without
+    touching email/username costs a single SELECT. A `created` user has no
+    postings yet, they are inserted without reading first.
+    """
+    grams = get_user_grams(user)
+    with transaction.atomic():
+        existing_grams = set()
+        if not created:
+            existing_grams = set(
+                UserSearchGram.objects.filter(user_id=user.user_id).values_list(
+                    "gram", flat=True
+                )
+            )
+        stale_grams = existing_grams - grams
+        if stale_grams:
+            UserSearchGram.objects.filter(
+                user_id=user.user_id, gram__in=stale_grams
+            ).delete()
+        UserSearchGram.objects.bulk_create(
+            [
+                UserSearchGram(gram=gram, user_id=user.user_id)
+                for gram in grams - existing_grams
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def index_users(users, batch_size=1000):
+    """
+    Rebuilds the postings of many users at once, used for backfills and imports.
+
+    Args:
+        users (iterable): User instances (only user_id, email and username are read).
+        batch_size (int): Number of postings inserted per statement.
+    """
+    users = list(users)
+    postings = [
+        UserSearchGram(gram=gram, user_id=user.user_id)
+        for user in users
+        for gram in get_user_grams(user)
+    ]
+    with transaction.atomic():
+        UserSearchGram.objects.filter(
+            user_id__in=[user.user_id for user in users]
+        ).delete()
+        UserSearchGram.objects.bulk_create(
+            postings, batch_size=batch_size, ignore_conflicts=True
+        )
+
+
+def search_users(queryset, search):
+    """
+    Filters a User queryset by `search` using the trigram index.
+
+    Candidates are the users whose postings contain every trigram of the
+    search term (posting intersection). The candidates are then checked
+    with icontains to drop false positives, and annotated with
+    `search_rank`: 3 for an exact match, 2 for a prefix match, 1 otherwise.
+
+    Terms shorter than a trigram can't use the index and fall back to a
+    plain icontains filter.
+
+    Args:
+        queryset (QuerySet): User queryset to filter.
+        search (str): Search term entered by the client.
+
+    Returns:
+        QuerySet: Filtered queryset annotated with `search_rank`.
+    """
+    grams = get_grams(search)
+    search_filter = Q(email__icontains=search) | Q(username__icontains=search)
+
+    if grams:
+        # Users that have every trigram of the search term
+        candidate_ids = (
+            UserSearchGram.objects.filter(gram__in=grams)
+            .values("user_id")
+            .annotate(hits=Count("gram"))
+            .filter(hits=len(grams))
+            .values("user_id")
+        )
+        queryset = queryset.filter(user_id__in=candidate_ids)
+
+    return queryset.filter(search_filter).annotate(
+        search_rank=Case(
+            When(Q(email__iexact=search) | Q(username__iexact=search), then=Value(3)),
+            When(
+                Q(email__istartswith=search) | Q(username__istartswith=search),
+                then=Value(2),
+            ),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    )
@@ -1,13 +1,182 @@
+from django.conf import settings
+from django.db import transaction
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from users_app.models import User
-from rest_framework.authtoken.models import Token
+from django.db.models.signals import pre_save, post_save, post_delete
+from users_app.models import User, FriendRequest, BlockedUser
+from users_app.search_index import index_user
+from users_app.autocomplete import autocomplete_index
+from users_app.block_cache import invalidate_block_sets
+from users_app.custom_authention import TOKEN_USER_CLAIMS, get_auth_token, invalidate_cached_user
+from users_app.friend_suggestions import (
+    discard_friend_suggestion,
+    invalidate_friend_suggestions,
+)
+from utils.cache_utils import bump_cache_version
 
 
 @receiver(post_save, sender=User)
 def basic_account_setting_create(sender, instance, created, **kwargs):
-    try:
-        if created:
-            Token.objects.create(user=instance)
-    except Exception:
-        pass
+    """
+    Creates the DRF auth token on sign up when CREATE_AUTH_TOKEN_ON_SIGNUP is set,
+    otherwise it is created on first use by get_auth_token.
+    """
+    if created and settings.CREATE_AUTH_TOKEN_ON_SIGNUP:
+        get_auth_token(instance)
+
+
+@receiver(pre_save, sender=User)
+def revoke_user_tokens(sender, instance, **kwargs):
+    """
+    Bumps the token version when the password or any claim copied into the
+    tokens changes (e.g. is_superuser on a demotion, is_active on a
+    deactivation), so tokens issued before stop authenticating.
+    Changes written with queryset.update() must call user.revoke_tokens().
+
+    The claims are compared with the values the user was loaded with
+    (User.from_db), so a save costs no extra query. Claims still deferred
+    weren't changed, claims set after a deferred load count as changed.
+    """
+    if instance._state.adding:
+        return
+    claims = [claim for claim in TOKEN_USER_CLAIMS if claim != "token_version"]
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded is None:
+        # Not loaded from the database, compare with the stored row
+        loaded = User.objects.filter(user_id=instance.user_id).values(*claims).first() or {
+            claim: getattr(instance, claim) for claim in claims
+        }
+    password_changed = instance._password is not None
+    claims_changed = any(
+        claim in instance.__dict__
+        and (claim not in loaded or instance.__dict__[claim] != loaded[claim])
+        for claim in claims
+    )
+    if password_changed or claims_changed:
+        instance.token_version += 1
+        # Also stored when the save is limited to other update_fields
+        User.objects.filter(user_id=instance.user_id).update(
+            token_version=instance.token_version
+        )
+
+
+@receiver(post_save, sender=User)
+def remember_saved_user_values(sender, instance, update_fields=None, **kwargs):
+    """
+    Updates the loaded values with what was just saved, so the next save of
+    the same instance compares the claims with the stored row.
+    """
+    if not hasattr(instance, "_loaded_values"):
+        instance._loaded_values = {}
+    for field in User._meta.concrete_fields:
+        if field.attname in instance.__dict__ and (
+            update_fields is None or field.name in update_fields
+        ):
+            instance._loaded_values[field.attname] = instance.__dict__[field.attname]
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_auth_cache(sender, instance, **kwargs):
+    """
+    Drops the cached token version and user so authentication sees the change.
+    """
+    transaction.on_commit(lambda: invalidate_cached_user(instance.user_id))
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_auth_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_cached_user(instance.user_id))
+
+
+@receiver(post_save, sender=User)
+def update_user_search_index(sender, instance, created, **kwargs):
+    """
+    Keeps the trigram postings of the user in sync with email and username.
+    Postings of deleted users are removed by the cascade on UserSearchGram.user.
+    """
+    index_user(instance, created=created)
+
+
+@receiver(post_save, sender=User)
+def update_autocomplete_index(sender, instance, **kwargs):
+    """
+    Patches this worker's autocomplete index in place.
+    Other workers pick the change up on their next catch-up refresh.
+    """
+    autocomplete_index.update_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def remove_from_autocomplete_index(sender, instance, **kwargs):
+    autocomplete_index.remove_user(instance.user_id)
+
+
+@receiver(post_save, sender=FriendRequest)
+def update_friend_suggestions_on_request(sender, instance, **kwargs):
+    """
+    Keeps cached friend suggestions in line with friend request changes.
+    Runs after commit so a concurrent rebuild can't cache the old graph.
+    """
+    sender_id, receiver_id = instance.sender_id, instance.receiver_id
+    if instance.status == 'accepted':
+        # New edge, the 2-hop neighbourhood of both users and their friends changed
+        transaction.on_commit(lambda: invalidate_friend_suggestions(sender_id, receiver_id))
+    elif instance.status == 'pending':
+        transaction.on_commit(lambda: discard_friend_suggestion(sender_id, receiver_id))
+    else:
+        transaction.on_commit(
+            lambda: invalidate_friend_suggestions(sender_id, receiver_id, include_friends=False)
+        )
+
+
+@receiver(post_delete, sender=FriendRequest)
+def invalidate_friend_suggestions_on_request_delete(sender, instance, **kwargs):
+    sender_id, receiver_id = instance.sender_id, instance.receiver_id
+    transaction.on_commit(
+        lambda: invalidate_friend_suggestions(sender_id, receiver_id, include_friends=False)
+    )
+
+
+@receiver(post_save, sender=BlockedUser)
+@receiver(post_delete, sender=BlockedUser)
+def invalidate_block_sets_on_block(sender, instance, **kwargs):
+    # Connected before the suggestions and friends_list receivers, so the
+    # block sets are dropped before rebuilt suggestions or friends lists read them
+    blocked_by_id, blocked_user_id = instance.blocked_by_id, instance.blocked_user_id
+    transaction.on_commit(lambda: invalidate_block_sets(blocked_by_id, blocked_user_id))
+
+
+@receiver(post_save, sender=BlockedUser)
+def update_friend_suggestions_on_block(sender, instance, created, **kwargs):
+    blocked_by_id, blocked_user_id = instance.blocked_by_id, instance.blocked_user_id
+    transaction.on_commit(lambda: discard_friend_suggestion(blocked_by_id, blocked_user_id))
+
+
+@receiver(post_delete, sender=BlockedUser)
+def invalidate_friend_suggestions_on_unblock(sender, instance, **kwargs):
+    blocked_by_id, blocked_user_id = instance.blocked_by_id, instance.blocked_user_id
+    transaction.on_commit(
+        lambda: invalidate_friend_suggestions(blocked_by_id, blocked_user_id, include_friends=False)
+    )
+
+
+def invalidate_friends_list(*user_ids):
+    """
+    Bumps the friends_list cache version of both endpoints of an edge after commit.
+    """
+    def bump():
+        for user_id in user_ids:
+            bump_cache_version('friends_list', user_id)
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=FriendRequest)
+@receiver(post_delete, sender=FriendRequest)
+def invalidate_friends_list_on_request(sender, instance, **kwargs):
+    invalidate_friends_list(instance.sender_id, instance.receiver_id)
+
+
+@receiver(post_save, sender=BlockedUser)
+@receiver(post_delete, sender=BlockedUser)
+def invalidate_friends_list_on_block(sender, instance, **kwargs):
+    invalidate_friends_list(instance.blocked_by_id, instance.blocked_user_id)
+
@@ -0,0 +1,171 @@
+from django.conf import settings
+from django.core.cache import cache
+import math
+import random
+import time
+import uuid
+
+
+# Backends whose entries are only visible to the process that wrote them
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_shared_cache(alias="default"):
+    """
+    Tells whether the cache is shared by all processes (database, Redis,
+    Memcached), rather than local to each one.
+    """
+    return settings.CACHES[alias]["BACKEND"] not in LOCAL_CACHE_BACKENDS
+
+
+def get_cache_version_key(namespace, ident):
+    return f"{namespace}_version_{ident}"
+
+
+def get_cache_version(namespace, ident):
+    """
+    Returns the current cache version of `namespace` for `ident` (e.g. a user id).
+
+    A missing version starts from the current time in nanoseconds rather
+    than 1, so an evicted version key can never make old entries current again.
+    """
+    version_key = get_cache_version_key(namespace, ident)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, time.time_ns(), timeout=None)
+        version = cache.get(version_key, 0)
+    return version
+
+
+def bump_cache_version(namespace, ident):
+    """
+    Invalidates every cached entry of `namespace` for `ident` at once.
+    Old entries are never read again and expire on their own timeout.
+    """
+    version_key = get_cache_version_key(namespace, ident)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        # Version key missing, start a new one that can't collide with old entries
+        cache.set(version_key, time.time_ns(), timeout=None)
+
+
+def get_versioned_cache_key(namespace, ident, suffix=""):
+    """
+    Builds a cache key that changes whenever `bump_cache_version` is called.
+
+    Args:
+        namespace (str): Kind of cached data, e.g. "friends_list".
+        ident: Owner of the data, e.g. a user id.
+        suffix (str): Variant of the data, e.g. the page parameters.
+    """
+    return f"{namespace}_{ident}_v{get_cache_version(namespace, ident)}_{suffix}"
+
+
+CACHE_STATS_EVENTS = ("hit", "miss", "early", "stale", "rebuild", "wait")
+
+
+def count_cache_event(name, event):
+    """
+    Increments a cross-process counter such as `cache_stats_friends_list_rebuild`.
+
+    Costs two cache writes per event, so it is a no-op unless CACHE_STATS_ENABLED.
+    """
+    if not settings.CACHE_STATS_ENABLED:
+        return
+    stats_key = f"cache_stats_{name}_{event}"
+    try:
+        cache.add(stats_key, 0, timeout=None)
+        cache.incr(stats_key)
+    except ValueError:
+        pass
+
+
+def get_cache_stats(name):
+    """
+    Returns the counters of a cached view, e.g. to check that a miss storm
+    produced a single rebuild. Only counted with CACHE_STATS_ENABLED.
+
+    Returns:
+        dict: {"hit": int, "miss": int, "early": int, "stale": int, "rebuild": int, "wait": int}
+    """
+    keys = {f"cache_stats_{name}_{event}": event for event in CACHE_STATS_EVENTS}
+    values = cache.get_many(keys.keys())
+    return {event: values.get(key, 0) for key, event in keys.items()}
+
+
+def get_or_rebuild(cache_key, rebuild, timeout, name="default", beta=1.0):
+    """
+    Reads `cache_key`, rebuilding it with `rebuild()` with stampede protection.
+
+    - Single flight: only the request that wins the cache lock rebuilds,
+      concurrent requests serve the stale value or wait for the new one.
+    - Probabilistic early expiration (XFetch): the entry is rebuilt before
+      it expires with a probability that grows as expiry approaches and with
+      how long the last rebuild took, so popular keys rarely expire at all.
+    - Stale while revalidate: entries are kept CACHE_STALE_TIMEOUT seconds
+      past their soft expiry so there is something to serve while one
+      request rebuilds.
+
+    Args:
+        cache_key (str): Cache key of the value.
+        rebuild (callable): Builds the value on a miss.
+        timeout (int): Seconds the value is considered fresh.
+        name (str): Name used for the hit/miss/rebuild counters.
+        beta (float): XFetch aggressiveness, > 1 rebuilds earlier.
+
+    Returns:
+        The cached or rebuilt value.
+    """
+    entry = cache.get(cache_key)
+    now = time.time()
+
+    if entry is not None:
+        # XFetch: -delta * beta * log(rand) is a random head start on expiry
+        early_by = -entry["delta"] * beta * math.log(1 - random.random())
+        if now + early_by < entry["expires_at"]:
+            count_cache_event(name, "hit")
+            return entry["value"]
+        count_cache_event(name, "early" if now < entry["expires_at"] else "stale")
+    else:
+        count_cache_event(name, "miss")
+
+    lock_key = f"{cache_key}_lock"
+    lock_token = uuid.uuid4().hex
+    lock_timeout = settings.CACHE_REBUILD_LOCK_TIMEOUT
+    if cache.add(lock_key, lock_token, timeout=lock_timeout):
+        try:
+            return _rebuild_entry(cache_key, rebuild, timeout, name)
+        finally:
+            if cache.get(lock_key) == lock_token:
+                cache.delete(lock_key)
+
+    # Somebody else is rebuilding, serve the stale value if there is one
+    if entry is not None:
+        return entry["value"]
+
+    # Nothing to serve yet, wait for the rebuild to land
+    count_cache_event(name, "wait")
+    deadline = time.time() + lock_timeout
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return entry["value"]
+        if cache.get(lock_key) is None:
+            break
+    # The rebuild failed or is too slow, build it ourselves
+    return _rebuild_entry(cache_key, rebuild, timeout, name)
+
+
+def _rebuild_entry(cache_key, rebuild, timeout, name):
+    count_cache_event(name, "rebuild")
+    started_at = time.time()
+    value = rebuild()
+    delta = time.time() - started_at
+    entry = {"value": value, "delta": delta, "expires_at": time.time() + timeout}
+    cache.set(cache_key, entry, timeout=timeout + settings.CACHE_STALE_TIMEOUT)
+    return value
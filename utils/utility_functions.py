@@ -1,9 +1,15 @@
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.conf import settings
+from django.db.models import Q
 from utils.constant import *
+import base64
+import json
 import time
 import os
-from datetime import date
+from datetime import date, datetime
 
 
 def custom_response(status, data={}, error=True, message="", is_pagination=False):
@@ -59,7 +65,200 @@ class CustomPagination(PageNumberPagination):
         }
 
 
-def custom_pagination(get_page_size, queryset, request, serializer_class, context={}):
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over a stable ordering.
+
+    Instead of COUNT(*) + OFFSET, every page is fetched with a
+    `WHERE (ordering) > (last row)` filter, so deep pages cost the same as
+    the first one. Cursors are opaque base64 strings holding the ordering
+    values of the boundary row. The total count is only computed when the
+    client passes `with_count=true`.
+
+    The ordering must be unique and non-null, e.g. ("-created_at", "-pk")
+    or ("user_id",).
+    """
+
+    page_size = 10  # Default page size for pagination
+    max_page_size = 999  # Maximum page size allowed for pagination
+    cursor_query_param = "cursor"  # Query parameter name for the opaque cursor
+    count_query_param = "with_count"  # Query parameter to opt in to the total count
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, ordering=("pk",)):
+        self.ordering = tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # self.page_size is set and validated by custom_pagination
+        self.request = request
+        cursor = self.decode_cursor(request)
+
+        # Count only on request, the whole point is to avoid the COUNT(*)
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "true":
+            self.count = queryset.count()
+
+        is_reverse = cursor["r"] if cursor else False
+        queryset = queryset.order_by(*self.get_ordering(is_reverse))
+        if cursor:
+            queryset = queryset.filter(self.get_keyset_filter(cursor["v"], is_reverse))
+
+        # Fetch one extra row to know whether there is another page
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if is_reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def get_ordering(self, is_reverse=False):
+        """
+        Returns the ordering, flipped when walking backwards.
+        """
+        if not is_reverse:
+            return self.ordering
+        return tuple(
+            field[1:] if field.startswith("-") else "-" + field
+            for field in self.ordering
+        )
+
+    def get_keyset_filter(self, values, is_reverse=False):
+        """
+        Builds the row-comparison filter `(a, b) > (x, y)` as
+        `a > x OR (a = x AND b > y)` honouring the direction of each field.
+        """
+        keyset_filter = Q()
+        equal_filter = Q()
+        for field, value in zip(self.ordering, values):
+            is_descending = field.startswith("-")
+            field = field.lstrip("-")
+            lookup = "lt" if is_descending != is_reverse else "gt"
+            keyset_filter |= equal_filter & Q(**{f"{field}__{lookup}": value})
+            equal_filter &= Q(**{field: value})
+        return keyset_filter
+
+    def get_position(self, instance):
+        return [
+            self.encode_value(getattr(instance, field.lstrip("-")))
+            for field in self.ordering
+        ]
+
+    @staticmethod
+    def encode_value(value):
+        # Keep full microsecond precision, DjangoJSONEncoder truncates it
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+
+    def encode_cursor(self, position, is_reverse=False):
+        cursor = json.dumps({"v": position, "r": is_reverse}, separators=(",", ":"))
+        encoded = base64.urlsafe_b64encode(cursor.encode("utf-8")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            if len(cursor["v"]) != len(self.ordering):
+                raise ValueError
+            cursor["r"] = bool(cursor.get("r", False))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        return self.encode_cursor(self.get_position(self.page[0]), is_reverse=True)
+
+    def get_paginated_response(self, data):
+        """
+        Same envelope as CustomPagination, `count` is only present when requested.
+        """
+        response = {
+            "links": {
+                "next": self.get_next_link(),  # Link to the next page
+                "previous": self.get_previous_link(),  # Link to the previous page
+            },
+        }
+        if self.count is not None:
+            response["count"] = self.count  # Total count, only on `with_count=true`
+        response[CUSTOM_RESPONSE_DATA] = data  # Paginated data for the current page
+        return response
+
+
+def get_pagination_profile(profile="default"):
+    """
+    Returns the page-size profile for an endpoint.
+
+    Profiles live in `settings.PAGINATION_PROFILES`, any key missing from a
+    profile falls back to the "default" profile.
+
+    Args:
+        profile (str): Name of the profile, e.g. "default" or "user_activity".
+
+    Returns:
+        dict: {"page_size": int, "max_page_size": int}
+    """
+    profiles = getattr(settings, "PAGINATION_PROFILES", {})
+    return {
+        "page_size": CustomPagination.page_size,
+        "max_page_size": CustomPagination.max_page_size,
+        **profiles.get("default", {}),
+        **profiles.get(profile, {}),
+    }
+
+
+def get_valid_page_size(get_page_size, pagination_profile):
+    """
+    Validates the requested page size and clamps it to the profile's maximum.
+
+    Args:
+        get_page_size (int | str | None): The page size requested by the client.
+        pagination_profile (dict): Profile returned by `get_pagination_profile`.
+
+    Returns:
+        int: A positive page size no larger than `max_page_size`.
+    """
+    try:
+        return _positive_int(
+            get_page_size,
+            strict=True,
+            cutoff=pagination_profile["max_page_size"],
+        )
+    except (TypeError, ValueError):
+        return min(pagination_profile["page_size"], pagination_profile["max_page_size"])
+
+
+def custom_pagination(
+    get_page_size,
+    queryset,
+    request,
+    serializer_class,
+    context=None,
+    ordering=None,
+    profile="default",
+):
     """
     Customizes pagination for a queryset based on parameters.
 
@@ -68,28 +267,36 @@ def custom_pagination(get_page_size, queryset, request, serializer_class, contex
         queryset (QuerySet): The queryset to be paginated.
         request (HttpRequest): The HTTP request object.
         serializer_class (Serializer): The serializer class used for serializing queryset data.
-        context (dict, optional): Additional context to pass to the serializer. Defaults to {}.
+        context (dict, optional): Additional context to pass to the serializer. Defaults to None.
+        ordering (tuple, optional): Unique ordering for keyset (cursor) pagination.
+            When given, KeysetPagination is used instead of page numbers.
+        profile (str, optional): Name of the page-size profile in
+            `settings.PAGINATION_PROFILES`. Defaults to "default".
 
     Returns:
         Response: Paginated response containing serialized data.
     """
-    pagination_class = CustomPagination  # Using CustomPagination class for pagination
+    pagination_profile = get_pagination_profile(profile)
 
-    if get_page_size:  # Checking if a specific page size is requested
-        pagination_class.page_size = (
-            get_page_size  # Setting the page size for pagination
-        )
+    if ordering:
+        # Keyset pagination, deep pages cost the same as the first one
+        paginator = KeysetPagination(ordering=ordering)
+    else:
+        paginator = CustomPagination()  # Using CustomPagination class for pagination
 
-    paginator = (
-        pagination_class()
-    )  # Initializing the paginator with the specified pagination class
+    # Page size is configured on this request's paginator only, the shared
+    # class is never mutated so concurrent requests can't leak into each other
+    paginator.max_page_size = pagination_profile["max_page_size"]
+    paginator.page_size = get_valid_page_size(get_page_size, pagination_profile)
 
     # Paginating the queryset based on the request
     pagination_queryset = paginator.paginate_queryset(
         queryset=queryset, request=request
     )
     # Serializing the paginated queryset data
-    serializer = serializer_class(pagination_queryset, context=context, many=True)
+    serializer = serializer_class(
+        pagination_queryset, context={} if context is None else context, many=True
+    )
     # Getting the paginated response
     response = paginator.get_paginated_response(serializer.data)
     return response  # Returning the paginated response